@@ -0,0 +1,271 @@
+"""Сквозной бенчмарк на локальных KudaGo и Telegram.
+
+Измеряет:
+    collect_data - время сбора дайджеста без кеша и с кешем;
+    delivery - пропускную способность background_notification
+        (сообщений в секунду) для заданного числа чатов;
+    webhook - p50/p99 ответа вебхука при параллельных обновлениях.
+
+Приложение запускается с отдельной базой SQLite во временном каталоге
+и направляется на заменители через переменные окружения Settings.
+Результат - JSON в stdout и, если задан --output, в файл.
+
+    python -m benchmarks.e2e --chats 1000 10000 100000 --output bench.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from datetime import UTC, datetime
+from benchmarks.fake_servers import FakeKudaGo, FakeTelegram, add_server_arguments
+
+
+def summarize(samples: list[float]) -> dict:
+    """Перцентили в миллисекундах"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": percentile(0.50),
+        "p90_ms": percentile(0.90),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def configure(
+    args: argparse.Namespace, kudago: FakeKudaGo, telegram: FakeTelegram, tmp: str
+) -> None:
+    """Направить Settings на заменители до импорта приложения"""
+    os.environ.update(
+        {
+            "URL_KUDA_GO": kudago.url,
+            "API_VERSION": kudago.api_version,
+            "TG_URL": telegram.url,
+            "TG_TOKEN": telegram.token,
+            "DB_URL": f"sqlite+aiosqlite:///{tmp}/bench.db",
+            "LOG_FILE_PATH": f"{tmp}/app.log",
+            "LOG_LEVEL": "WARNING",
+            "APP_DELIVERY": "false",
+            "TG_GLOBAL_RATE": str(args.global_rate),
+            "TG_CHAT_RATE": str(args.chat_rate),
+            "DELIVERY_CONCURRENCY": str(args.concurrency),
+        }
+    )
+
+
+async def migrate() -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    # env.py миграций сам запускает цикл событий, поэтому в отдельном потоке
+    await asyncio.to_thread(command.upgrade, Config("alembic.ini"), "head")
+
+
+async def bench_collect_data(iterations: int) -> dict:
+    from src.core.config import config
+    from src.dependencies.http_client import http_client
+    from src.services.api_kudago import collect_data, digest_cache, place_cache
+
+    config.kudago_store_ttl = 0
+    cold, warm = [], []
+    session = http_client.kudago_session
+    for _ in range(iterations):
+        digest_cache.invalidate()
+        place_cache.invalidate()
+        start = time.perf_counter()
+        await collect_data(session)
+        cold.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        await collect_data(session)
+        warm.append(time.perf_counter() - start)
+    return {"cold": summarize(cold), "cached": summarize(warm)}
+
+
+async def reset_chats(count: int) -> None:
+    from sqlalchemy import text
+    from src.database.crud import batched_ids, create_chat_ids
+    from src.database.session import async_session
+
+    async with async_session() as db:
+        for table in ("outbox", "digest", "chatseen", "chat"):
+            await db.execute(text(f"DELETE FROM {table}"))
+        await db.commit()
+        for batch in batched_ids(list(range(1, count + 1)), 5000):
+            await create_chat_ids(db, batch)
+        # все чаты должны получить рассылку прямо сейчас
+        await db.execute(
+            text("UPDATE chat SET next_delivery_at = :at"),
+            {"at": datetime(2000, 1, 1)},
+        )
+        await db.commit()
+
+
+async def bench_delivery(chat_counts: list[int], telegram: FakeTelegram) -> list:
+    from src.services.scheduler import background_notification
+
+    results = []
+    for count in chat_counts:
+        await reset_chats(count)
+        sent_before = telegram.sent
+        start = time.perf_counter()
+        await background_notification()
+        elapsed = time.perf_counter() - start
+        sent = telegram.sent - sent_before
+        results.append(
+            {
+                "chats": count,
+                "messages": sent,
+                "seconds": elapsed,
+                "messages_per_second": sent / elapsed if elapsed else 0.0,
+            }
+        )
+    return results
+
+
+async def bench_webhook(updates: int, concurrency: int) -> dict:
+    import httpx
+    from src.main import app
+    from src.services.bot_commands import update_queue
+
+    latencies = []
+    statuses: dict[int, int] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(client: httpx.AsyncClient, update_id: int) -> None:
+        payload = {
+            "update_id": update_id,
+            "message": {"chat": {"id": 10_000_000 + update_id}, "text": "/help"},
+        }
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/webhook", json=payload)
+            latencies.append(time.perf_counter() - start)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(post(client, i) for i in range(1, updates + 1)))
+            elapsed = time.perf_counter() - start
+            while True:
+                stats = update_queue.stats()
+                if stats["depth"] == 0 and (
+                    stats["processed"] + stats["failed"] >= stats["accepted"]
+                ):
+                    break
+                await asyncio.sleep(0.05)
+            drained = time.perf_counter() - start
+    return {
+        "updates": updates,
+        "concurrency": concurrency,
+        "statuses": statuses,
+        "requests_per_second": updates / elapsed if elapsed else 0.0,
+        "response": summarize(latencies),
+        "processed_in_seconds": drained,
+        "queue": update_queue.stats(),
+    }
+
+
+async def main(args: argparse.Namespace) -> dict:
+    options = {
+        "latency": args.latency,
+        "error_rate": args.error_rate,
+        "rate_limit_rate": args.rate_limit_rate,
+    }
+    kudago = await FakeKudaGo(**options).start()
+    telegram = await FakeTelegram(**options).start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            configure(args, kudago, telegram, tmp)
+            await migrate()
+            from src.dependencies.http_client import http_client
+
+            # пулы соединений, как их открывает приложение или воркер
+            await http_client.start()
+            results = {}
+            try:
+                if "collect" in args.only:
+                    results["collect_data"] = await bench_collect_data(args.iterations)
+                if "delivery" in args.only:
+                    results["delivery"] = await bench_delivery(args.chats, telegram)
+                if "webhook" in args.only:
+                    results["webhook"] = await bench_webhook(
+                        args.updates, args.webhook_concurrency
+                    )
+            finally:
+                await http_client.close()
+    finally:
+        await kudago.stop()
+        await telegram.stop()
+    return {
+        "timestamp": datetime.now(UTC).isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "parameters": vars(args),
+        "servers": {"kudago": kudago.stats(), "telegram": telegram.stats()},
+        "results": results,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_server_arguments(parser)
+    parser.add_argument("--chats", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--webhook-concurrency", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=64)
+    # лимиты Telegram по умолчанию сняты: меряется сама рассылка
+    parser.add_argument("--global-rate", type=float, default=1_000_000.0)
+    parser.add_argument("--chat-rate", type=float, default=1_000_000.0)
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=("collect", "delivery", "webhook"),
+        default=["collect", "delivery", "webhook"],
+    )
+    parser.add_argument("--output", help="файл для JSON с результатами")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    # сообщения приложения - в stderr, в stdout только JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        report = asyncio.run(main(args))
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    print(output, file=sys.stdout)
@@ -0,0 +1,276 @@
+"""Локальные заменители KudaGo и Telegram Bot API для бенчмарков.
+
+Оба сервера на aiohttp, с настраиваемой задержкой ответа, долей ошибок
+5xx и долей ответов 429. Приложение направляется на них через Settings
+(URL_KUDA_GO, API_VERSION, TG_URL, TG_TOKEN).
+
+Запуск отдельно:
+    python -m benchmarks.fake_servers --latency 0.05 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from aiohttp import web
+
+
+class FakeServer:
+    """Общая часть: задержка, ошибки, счётчики запросов"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: int = 1,
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def routes(self, app: web.Application) -> None:
+        raise NotImplementedError
+
+    async def start(self) -> "FakeServer":
+        app = web.Application()
+        self.routes(app)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # при port=0 порт выбирает система
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def failure(self) -> web.Response | None:
+        """Задержка ответа и, с заданной вероятностью, ответ 5xx или 429"""
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            self.rate_limited += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": "Too Many Requests: retry later",
+                    "parameters": {"retry_after": self.retry_after},
+                },
+                status=429,
+            )
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.errors += 1
+            return web.json_response(
+                {"ok": False, "error_code": 502, "description": "Bad Gateway"},
+                status=502,
+            )
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+        }
+
+
+class FakeKudaGo(FakeServer):
+    """Списки KudaGo с постраничной выдачей и ссылками next"""
+
+    def __init__(self, api_version: str = "v1.4", total: int = 500, **kwargs):
+        super().__init__(**kwargs)
+        self.api_version = api_version
+        self.total = total
+
+    def routes(self, app: web.Application) -> None:
+        for endpoint in ("events", "places", "lists", "movies", "news"):
+            app.router.add_get(f"/{self.api_version}/{endpoint}", self.handle)
+
+    def item(self, endpoint: str, item_id: int) -> dict:
+        image = {
+            "image": f"https://media.example/{endpoint}/{item_id}.jpg",
+            "source": {"name": "example", "link": "https://example"},
+        }
+        if endpoint == "places":
+            return {"id": item_id, "title": f"Место {item_id}", "address": "ул. 1"}
+        if endpoint == "lists":
+            return {
+                "id": item_id,
+                "title": f"Подборка {item_id}",
+                "site_url": f"https://kudago.example/list/{item_id}/",
+            }
+        if endpoint == "events":
+            start = int(time.time()) + 86400
+            return {
+                "id": item_id,
+                "title": f"Событие {item_id}",
+                "description": "Описание события",
+                "dates": [{"start": start, "end": start + 3600}],
+                "images": [image],
+                "place": {"id": item_id % 50 + 1},
+                "price": "от 500 рублей",
+            }
+        return {
+            "id": item_id,
+            "title": f"{endpoint} {item_id}",
+            "description": "Описание",
+            "images": [image],
+            "site_url": f"https://kudago.example/{endpoint}/{item_id}/",
+        }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        error = await self.failure()
+        if error is not None:
+            return error
+        endpoint = request.path.rsplit("/", 1)[-1]
+        page = int(request.query.get("page", 1))
+        page_size = int(request.query.get("page_size", 20))
+        if "ids" in request.query:
+            ids = [int(i) for i in request.query["ids"].split(",") if i]
+        else:
+            start = (page - 1) * page_size
+            ids = list(range(start + 1, min(start + page_size, self.total) + 1))
+        next_url = None
+        if "ids" not in request.query and page * page_size < self.total:
+            next_url = str(request.url.update_query(page=page + 1))
+        return web.json_response(
+            {
+                "count": len(ids) if "ids" in request.query else self.total,
+                "next": next_url,
+                "previous": None,
+                "results": [self.item(endpoint, item_id) for item_id in ids],
+            }
+        )
+
+
+class FakeTelegram(FakeServer):
+    """Методы Bot API, которые использует приложение"""
+
+    def __init__(self, token: str = "bench", **kwargs):
+        super().__init__(**kwargs)
+        self.token = token
+        self.sent = 0
+        self._message_id = 0
+
+    def routes(self, app: web.Application) -> None:
+        app.router.add_route("*", f"/bot{self.token}/{{method}}", self.handle)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        error = await self.failure()
+        if error is not None:
+            return error
+        method = request.match_info["method"]
+        if request.content_type == "application/json":
+            body = await request.json()
+        else:
+            body = dict(await request.post())
+        if method == "getMe":
+            return web.json_response(
+                {
+                    "ok": True,
+                    "result": {
+                        "id": 1,
+                        "is_bot": True,
+                        "first_name": "bench",
+                        "username": "bench_bot",
+                        "can_join_groups": True,
+                        "can_read_all_group_messages": False,
+                        "supports_inline_queries": False,
+                        "can_connect_to_business": False,
+                        "has_main_web_app": False,
+                        "has_topics_enabled": False,
+                    },
+                }
+            )
+        if method not in ("sendMessage", "sendPhoto"):
+            return web.json_response({"ok": True, "result": True, "description": "ok"})
+        self.sent += 1
+        self._message_id += 1
+        chat_id = int(body["chat_id"])
+        result = {
+            "message_id": self._message_id,
+            "from": {
+                "id": 1,
+                "is_bot": True,
+                "first_name": "bench",
+                "username": "bench_bot",
+            },
+            "chat": {
+                "id": chat_id,
+                "first_name": "user",
+                "last_name": None,
+                "username": None,
+                "type": "private",
+            },
+            "date": int(time.time()),
+        }
+        if method == "sendPhoto":
+            result["caption"] = body.get("caption")
+            result["photo"] = [
+                {
+                    "file_id": f"file-{body['photo'][-16:]}",
+                    "file_unique_id": "u",
+                    "file_size": 1000,
+                    "width": 800,
+                    "height": 600,
+                }
+            ]
+        else:
+            result["text"] = body.get("text")
+        return web.json_response({"ok": True, "result": result})
+
+
+async def serve(args: argparse.Namespace) -> None:
+    options = {
+        "latency": args.latency,
+        "error_rate": args.error_rate,
+        "rate_limit_rate": args.rate_limit_rate,
+    }
+    kudago = await FakeKudaGo(port=args.kudago_port, **options).start()
+    telegram = await FakeTelegram(port=args.telegram_port, **options).start()
+    print(f"URL_KUDA_GO={kudago.url}\nAPI_VERSION={kudago.api_version}")
+    print(f"TG_URL={telegram.url}\nTG_TOKEN={telegram.token}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await kudago.stop()
+        await telegram.stop()
+
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка, с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля 5xx")
+    parser.add_argument(
+        "--rate-limit-rate", type=float, default=0.0, help="доля ответов 429"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_server_arguments(parser)
+    parser.add_argument("--kudago-port", type=int, default=8765)
+    parser.add_argument("--telegram-port", type=int, default=8766)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
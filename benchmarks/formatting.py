@@ -0,0 +1,253 @@
+"""Микробенчмарки форматирования сообщений дайджеста.
+
+Сравнивает текущие date_event, to_datetime, сборку DigestItem
+и process_collect_data с прежними реализациями на синтетических
+ответах KudaGo растущего размера. Результат - JSON в stdout и,
+если задан --output, в файл.
+
+    python -m benchmarks.formatting --output formatting.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import time
+import timeit
+
+from datetime import UTC, datetime
+
+# настройки приложения читаются при импорте, сеть и база не нужны
+for name, value in {
+    "URL_KUDA_GO": "http://127.0.0.1",
+    "API_VERSION": "v1.4",
+    "TG_URL": "http://127.0.0.1",
+    "TG_TOKEN": "bench",
+    "DB_URL": "sqlite+aiosqlite:///:memory:",
+    "LOG_LEVEL": "WARNING",
+}.items():
+    os.environ.setdefault(name, value)
+
+from src.schemas.digest_schema import DigestItem, DigestKind  # noqa: E402
+from src.schemas.kudago_schema import DatesModel, SchemaGetEvents  # noqa: E402
+from src.services import api_kudago  # noqa: E402
+
+
+def legacy_to_datetime(unixtime: int) -> str:
+    return str(datetime.fromtimestamp(unixtime))
+
+
+def legacy_date_event(dates: list[dict[str, int]]) -> str:
+    result = []
+    now_unix = int(datetime.now().timestamp())
+    for date_dict in dates:
+        start_unix = date_dict.get("start")
+        if start_unix is None or start_unix < now_unix:
+            continue
+        end_unix = date_dict.get("end", start_unix)
+        start_dt = datetime.fromtimestamp(start_unix)
+        end_dt = datetime.fromtimestamp(end_unix)
+        result.append(f"С {start_dt} по {end_dt}")
+    return "\n".join(result) if result else ""
+
+
+def legacy_prepare_message(event: dict) -> str:
+    message = ""
+    for key, value in event.items():
+        if "image" == key:
+            continue
+        if len(value) == 0:
+            continue
+        if "dates" == key:
+            message += f"Дата проведения: {value}\n"
+            continue
+        message += f"{value}\n"
+    return message
+
+
+def make_dates(count: int, future_share: float = 0.1) -> list[dict[str, int]]:
+    """Даты по возрастанию, из них future_share - в будущем"""
+    now = int(time.time())
+    past = count - int(count * future_share)
+    # ежедневные сеансы, как у постоянных выставок
+    return [
+        {"start": now + (i - past) * 86400, "end": now + (i - past) * 86400 + 7200}
+        for i in range(count)
+    ]
+
+
+def make_events(count: int, dates_per_event: int) -> SchemaGetEvents:
+    image = {"image": "https://media.example/1.jpg", "source": {"name": "n"}}
+    return SchemaGetEvents(
+        count=count,
+        results=[
+            {
+                "id": i,
+                "title": f"Событие {i}",
+                "description": "Описание события " * 10,
+                "dates": make_dates(dates_per_event),
+                "images": [image],
+                "place": None,
+                "price": "от 500 рублей",
+            }
+            for i in range(count)
+        ],
+    )
+
+
+def unwrap(function):
+    """Функция без обёртки log_debug, чтобы мерить только её саму"""
+    return getattr(function, "__wrapped__", function)
+
+
+def measure(function, *args, number: int, repeat: int) -> dict:
+    """Лучшее и медианное время одного вызова, мкс"""
+    timings = timeit.repeat(lambda: function(*args), number=number, repeat=repeat)
+    per_call = sorted(t / number * 1e6 for t in timings)
+    return {"best_us": per_call[0], "median_us": per_call[len(per_call) // 2]}
+
+
+def compare(current, legacy, *args, number: int, repeat: int) -> dict:
+    result = {
+        "current": measure(current, *args, number=number, repeat=repeat),
+        "legacy": measure(legacy, *args, number=number, repeat=repeat),
+    }
+    result["speedup"] = result["legacy"]["best_us"] / result["current"]["best_us"]
+    return result
+
+
+def bench_date_event(sizes: list[int], repeat: int) -> list:
+    results = []
+    for size in sizes:
+        dates = make_dates(size)
+        models = [DatesModel(**date) for date in dates]
+        assert api_kudago.date_event(models) == legacy_date_event(dates)
+        number = max(1, 20000 // size)
+        current = measure(
+            unwrap(api_kudago.date_event), models, number=number, repeat=repeat
+        )
+        legacy = measure(legacy_date_event, dates, number=number, repeat=repeat)
+        results.append(
+            {
+                "dates": size,
+                "current": current,
+                "legacy": legacy,
+                "speedup": legacy["best_us"] / current["best_us"],
+            }
+        )
+    return results
+
+
+def bench_to_datetime(repeat: int) -> dict:
+    unixtime = int(time.time())
+    return compare(
+        unwrap(api_kudago.to_datetime),
+        legacy_to_datetime,
+        unixtime,
+        number=20000,
+        repeat=repeat,
+    )
+
+
+def legacy_event_item(event) -> tuple[str, str]:
+    """Прежний путь: model_dump, промежуточный словарь, prepare_message"""
+    event = event.model_dump()
+    item = {
+        "title": event.get("title"),
+        "description": event.get("description"),
+        "place": "Место, ул. 1",
+        "price": event.get("price"),
+        "image": event.get("images")[0].get("image"),
+        "dates": legacy_date_event(event.get("dates")),
+    }
+    return legacy_prepare_message(item), item["image"]
+
+
+def current_event_item(event) -> tuple[str, str]:
+    dates = api_kudago.date_event(event.dates)
+    item = DigestItem.build(
+        DigestKind.EVENT,
+        event.id,
+        event.title,
+        event.description,
+        "Место, ул. 1",
+        event.price,
+        f"Дата проведения: {dates}" if dates else None,
+        image=event.images[0].image,
+    )
+    return item.text, item.image
+
+
+def bench_event_item(dates_per_event: int, repeat: int) -> dict:
+    """Элемент дайджеста из провалидированного события"""
+    event = make_events(1, dates_per_event).results[0]
+    assert current_event_item(event) == legacy_event_item(event)
+    return {
+        "dates_per_event": dates_per_event,
+        **compare(
+            current_event_item, legacy_event_item, event, number=2000, repeat=repeat
+        ),
+    }
+
+
+def bench_process_collect_data(sizes: list[int], dates_per_event: int) -> list:
+    async def run(data: list) -> float:
+        start = time.perf_counter()
+        await api_kudago.process_collect_data(None, data)
+        return time.perf_counter() - start
+
+    async def no_places(session, data):
+        return {}
+
+    # места не запрашиваются: меряется только сборка словарей
+    api_kudago.resolve_places = no_places
+    results = []
+    for size in sizes:
+        data = [make_events(size, dates_per_event)]
+        timings = [asyncio.run(run(data)) for _ in range(5)]
+        results.append(
+            {
+                "events": size,
+                "dates_per_event": dates_per_event,
+                "best_ms": min(timings) * 1000,
+            }
+        )
+    return results
+
+
+def main(args: argparse.Namespace) -> dict:
+    random.seed(0)
+    return {
+        "timestamp": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "parameters": vars(args),
+        "results": {
+            "to_datetime": bench_to_datetime(args.repeat),
+            "date_event": bench_date_event(args.dates, args.repeat),
+            "event_item": bench_event_item(args.dates_per_event, args.repeat),
+            "process_collect_data": bench_process_collect_data(
+                args.events, args.dates_per_event
+            ),
+        },
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dates", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--events", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--dates-per-event", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="файл для JSON с результатами")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    output = json.dumps(main(args), ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    print(output)
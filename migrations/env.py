@@ -3,6 +3,17 @@ from logging.config import fileConfig
 
 from src.models.base import Base
 from src.models.chats import Chat
+from src.models.telegram_files import TelegramFile
+from src.models.outbox import Digest, Outbox
+from src.models.scheduler_lock import SchedulerLock
+from src.models.chat_seen import ChatSeen
+from src.models.kudago_cache import (
+    CachedCollection,
+    CachedEvent,
+    CachedMovie,
+    CachedNews,
+    CachedPlace,
+)
 from src.core.config import config as core_config
 
 from sqlalchemy import pool
@@ -0,0 +1,52 @@
+"""Use bigint for chat ids
+
+Revision ID: 08623d4542cf
+Revises: 49fdbaed21f2
+Create Date: 2026-10-18 10:30:00.075701
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '08623d4542cf'
+down_revision: Union[str, Sequence[str], None] = '49fdbaed21f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# id чатов Telegram не помещаются в 32 бита: супергруппы -100...,
+# пользователи до 52 бит
+CHAT_ID_COLUMNS = ("chat", "outbox", "chatseen")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # INTEGER в SQLite и так 64-битный, а INTEGER PRIMARY KEY
+    # должен остаться псевдонимом rowid
+    if op.get_bind().dialect.name == "sqlite":
+        return
+    for table in CHAT_ID_COLUMNS:
+        op.alter_column(
+            table,
+            "chat_id",
+            existing_type=sa.Integer(),
+            type_=sa.BigInteger(),
+            existing_nullable=False,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == "sqlite":
+        return
+    for table in CHAT_ID_COLUMNS:
+        op.alter_column(
+            table,
+            "chat_id",
+            existing_type=sa.BigInteger(),
+            type_=sa.Integer(),
+            existing_nullable=False,
+        )
@@ -1,6 +1,8 @@
 import aiohttp
+import os
+import socket
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import PrivateAttr, model_validator
+from pydantic import Field, PrivateAttr, model_validator
 from pathlib import Path
 
 BASE_DIR = Path(".").resolve()
@@ -14,12 +16,78 @@ class Settings(BaseSettings):
     tg_url: str
     tg_token: str
     timeout: int = 60
+    http_dns_cache_ttl: int = 300
+    http_keepalive_timeout: float = 30.0
+    tg_pool_limit: int = 100
+    tg_pool_limit_per_host: int = 100
+    kudago_pool_limit: int = 30
+    kudago_pool_limit_per_host: int = 20
     db_url: str
+    db_echo: bool = False
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout: int = 5000
+    sqlite_cache_size: int = -20000
     _client_timeout: aiohttp.ClientTimeout = PrivateAttr(default=None)
     log_level: str = "INFO"
     log_file_path: str = "src/logs/app.logs"
     log_max_bytes: int = 5 * 1024 * 1024
     log_backup_count: int = 3
+    log_debug_mode: str = "log"
+    log_debug_sample_rate: float = 1.0
+    delivery_concurrency: int = 64
+    tg_global_rate: float = 30.0
+    tg_chat_rate: float = 1.0
+    tg_retry_attempts: int = 5
+    tg_retry_base_delay: float = 0.5
+    tg_retry_max_delay: float = 30.0
+    tg_retry_budget_ratio: float = 0.1
+    tg_retry_budget_min: int = 10
+    tg_global_429_threshold: int = 3
+    tg_full_validation: bool = False
+    chat_page_size: int = 1000
+    bulk_batch_size: int = 500
+    prune_mode: str = "deactivate"
+    prune_batch_size: int = 100
+    digest_cache_ttl: int = 600
+    digest_cache_refresh_ahead: float | None = 0.8
+    place_cache_ttl: int = 7 * 24 * 60 * 60
+    place_cache_size: int = 10000
+    places_chunk_size: int = 100
+    kudago_store_ttl: int = 1800
+    kudago_page_size: int = 100
+    kudago_max_pages: int = 50
+    kudago_fetch_budget: float = 30.0
+    webhook_workers: int = 8
+    webhook_queue_size: int = 1000
+    webhook_drain_timeout: float = 10.0
+    update_dedup_window: int = 10000
+    update_state_path: str | None = None
+    update_state_save_every: int = 100
+    update_state_max_age: int = 24 * 60 * 60
+    outbox_max_attempts: int = 8
+    outbox_retry_delay: float = 60.0
+    outbox_retry_max_delay: float = 3600.0
+    outbox_drain_interval: int = 60
+    outbox_retention_days: int = 7
+    outbox_claim_size: int = 200
+    outbox_lease_seconds: int = 600
+    instance_id: str = Field(
+        default_factory=lambda: f"{socket.gethostname()}-{os.getpid()}"
+    )
+    worker_shard: int | None = None
+    worker_shards: int = 1
+    leader_lock_ttl: int = 60
+    app_delivery: bool = True
+    default_delivery_time: str = "12:00"
+    default_timezone: str = "Europe/Moscow"
+    deliver_only_new: bool = True
+    seen_items_limit: int = 1000
 
     model_config = SettingsConfigDict(
         env_file=".env",
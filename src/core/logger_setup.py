@@ -37,7 +37,8 @@ def setup_app_logging():
     )
 
     root_logger = logging.getLogger()
-    root_logger.setLevel(logging.DEBUG)
+    # при уровне выше DEBUG декоратор log_debug не форматирует аргументы
+    root_logger.setLevel(config.log_level)
     root_logger.addHandler(queue_handler)
 
     for logger_name in (None, "uvicorn", "uvicorn.access", "uvicorn.error"):
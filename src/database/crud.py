@@ -1,10 +1,36 @@
+import hashlib
+import json
 import logging
+from datetime import datetime, timedelta
 from fastapi import HTTPException
+from src.core.config import config
+from src.models.base import utcnow
 from src.models.chats import Chat
+from src.models.chat_seen import ChatSeen
+from src.models.kudago_cache import CachedItem
+from src.models.outbox import Digest, Outbox
+from src.models.scheduler_lock import SchedulerLock
+from src.models.telegram_files import TelegramFile
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from sqlalchemy import select, delete
+from sqlalchemy import Insert, or_, select, delete, update
+from typing import AsyncIterator
+from sqlalchemy.dialects import postgresql, sqlite
 from src.utils.debug_logs import log_debug
+from src.utils.delivery_time import next_delivery_at
+
+
+def upsert_stmt(db_session: AsyncSession, model: type) -> Insert:
+    """INSERT с поддержкой ON CONFLICT для диалекта текущей базы"""
+    if db_session.bind.dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def content_hash(payload: dict) -> str:
+    """sha256 от канонического JSON представления записи"""
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
 
 
 @log_debug
@@ -21,7 +47,7 @@ async def create_chat_id(
             created_at: YYYY-MM_DDTHH:MM:SS
         HTTPException: Ошибки 409 или 500
     """
-    new_chat = Chat(chat_id=chat_id)
+    new_chat = Chat(chat_id=chat_id, next_delivery_at=next_delivery_at(None, None))
     db_session.add(new_chat)
     try:
         await db_session.commit()
@@ -29,6 +55,15 @@ async def create_chat_id(
         return new_chat
     except IntegrityError:
         await db_session.rollback()
+        chat = await db_session.get(Chat, chat_id)
+        if chat is not None and not chat.is_active:
+            # чат был отключён после блокировки бота, /start включает его снова
+            chat.is_active = True
+            chat.delivery_status = None
+            chat.status_changed_at = utcnow()
+            chat.next_delivery_at = next_delivery_at(chat.delivery_time, chat.timezone)
+            await db_session.commit()
+            return chat
         raise HTTPException(
             status_code=409, detail=f"Идентификатор чата {chat_id} уже существует"
         )
@@ -78,20 +113,653 @@ async def delete_chat(db_session: AsyncSession, chat_id: int) -> bool:
         return False
 
 
+def batched_ids(chat_ids: list[int], size: int | None = None) -> list[list[int]]:
+    """Разбить список id на пачки для IN (...) и многострочных INSERT"""
+    size = size or config.bulk_batch_size
+    return [chat_ids[i : i + size] for i in range(0, len(chat_ids), size)]
+
+
+@log_debug
+async def create_chat_ids(
+    db_session: AsyncSession, chat_ids: list[int]
+) -> dict[int, str]:
+    """Добавить несколько чатов в базу
+    Пачками выполняется INSERT ... ON CONFLICT DO NOTHING RETURNING,
+    уже существующие чаты не вызывают ошибку. Чаты, отключённые после
+    блокировки бота, включаются снова, как при /start.
+    Args:
+        db_session (AsyncSession): сессия для работы с базой
+        chat_ids (list[int]): идентификаторы чатов
+    Returns:
+        dict[int, str]: {chat_id: "added", "reactivated" или "exists"}
+    """
+    unique_ids = list(dict.fromkeys(chat_ids))
+    added = set()
+    reactivated = set()
+    delivery_at = next_delivery_at(None, None)
+    try:
+        for batch in batched_ids(unique_ids):
+            stmt = (
+                upsert_stmt(db_session, Chat)
+                .values(
+                    [
+                        {"chat_id": chat_id, "next_delivery_at": delivery_at}
+                        for chat_id in batch
+                    ]
+                )
+                .on_conflict_do_nothing(index_elements=[Chat.chat_id])
+                .returning(Chat.chat_id)
+            )
+            added.update((await db_session.scalars(stmt)).all())
+            inactive = (
+                await db_session.execute(
+                    select(Chat.chat_id, Chat.delivery_time, Chat.timezone).where(
+                        Chat.chat_id.in_(batch), ~Chat.is_active
+                    )
+                )
+            ).all()
+            if inactive:
+                now = utcnow()
+                await db_session.execute(
+                    update(Chat),
+                    [
+                        {
+                            "chat_id": chat_id,
+                            "is_active": True,
+                            "delivery_status": None,
+                            "status_changed_at": now,
+                            "next_delivery_at": next_delivery_at(
+                                delivery_time, timezone
+                            ),
+                        }
+                        for chat_id, delivery_time, timezone in inactive
+                    ],
+                )
+                reactivated.update(chat_id for chat_id, _, _ in inactive)
+        await db_session.commit()
+    except SQLAlchemyError:
+        await db_session.rollback()
+        raise HTTPException(status_code=500, detail="Ошибка при добавлении в базу")
+    return {
+        chat_id: (
+            "added"
+            if chat_id in added
+            else "reactivated" if chat_id in reactivated else "exists"
+        )
+        for chat_id in unique_ids
+    }
+
+
+@log_debug
+async def delete_chats(db_session: AsyncSession, chat_ids: list[int]) -> dict[int, str]:
+    """Удалить несколько чатов
+    Пачками выполняется DELETE ... WHERE chat_id IN (...) RETURNING.
+    Args:
+        db_session (AsyncSession): сессия для работы с базой
+        chat_ids (list[int]): идентификаторы чатов
+    Returns:
+        dict[int, str]: {chat_id: "deleted" или "not_found"}
+    """
+    unique_ids = list(dict.fromkeys(chat_ids))
+    deleted = set()
+    try:
+        for batch in batched_ids(unique_ids):
+            stmt = delete(Chat).where(Chat.chat_id.in_(batch)).returning(Chat.chat_id)
+            deleted.update((await db_session.scalars(stmt)).all())
+        await db_session.commit()
+    except SQLAlchemyError:
+        await db_session.rollback()
+        raise HTTPException(status_code=500, detail="Ошибка при удалении из базы")
+    return {
+        chat_id: "deleted" if chat_id in deleted else "not_found"
+        for chat_id in unique_ids
+    }
+
+
+async def iter_chat_id_chunks(
+    db_session: AsyncSession,
+    chunk_size: int | None = None,
+    active_only: bool = True,
+) -> AsyncIterator[list[int]]:
+    """Постранично получить идентификаторы чатов
+    Keyset пагинация по первичному ключу: каждая страница - отдельный
+    запрос WHERE chat_id > последний_id LIMIT chunk_size, ORM объекты
+    не создаются.
+    Args:
+        db_session (AsyncSession): сессия для работы с базой
+        chunk_size (int): размер страницы, по умолчанию config.chat_page_size
+        active_only (bool): пропускать чаты, отключённые после ошибок доставки
+    Yields:
+        list[int]: очередная страница идентификаторов по возрастанию
+    """
+    chunk_size = chunk_size or config.chat_page_size
+    last_chat_id = None
+    while True:
+        stmt = select(Chat.chat_id).order_by(Chat.chat_id).limit(chunk_size)
+        if active_only:
+            stmt = stmt.where(Chat.is_active)
+        if last_chat_id is not None:
+            stmt = stmt.where(Chat.chat_id > last_chat_id)
+        try:
+            chunk = list((await db_session.scalars(stmt)).all())
+        except SQLAlchemyError:
+            raise HTTPException(status_code=500, detail="Ошибка при обращении к базе")
+        if chunk:
+            yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last_chat_id = chunk[-1]
+
+
+@log_debug
+async def deactivate_chats(
+    db_session: AsyncSession, statuses: dict[int, str], remove: bool = False
+) -> int:
+    """Отключить рассылку для чатов, в которые доставка невозможна
+    Args:
+        db_session (AsyncSession): сессия для работы с базой
+        statuses (dict[int, str]): {chat_id: причина}, например blocked
+        remove (bool): удалить чаты вместо отключения
+    Returns:
+        int: число изменённых чатов
+    """
+    by_status: dict[str, list[int]] = {}
+    for chat_id, status in statuses.items():
+        by_status.setdefault(status, []).append(chat_id)
+    changed = 0
+    try:
+        for status, chat_ids in by_status.items():
+            for batch in batched_ids(chat_ids):
+                if remove:
+                    stmt = delete(Chat).where(Chat.chat_id.in_(batch))
+                else:
+                    stmt = (
+                        update(Chat)
+                        .where(Chat.chat_id.in_(batch))
+                        .values(
+                            is_active=False,
+                            delivery_status=status,
+                            status_changed_at=utcnow(),
+                        )
+                    )
+                result = await db_session.execute(stmt)
+                changed += result.rowcount
+        await db_session.commit()
+    except SQLAlchemyError:
+        await db_session.rollback()
+        raise
+    return changed
+
+
+@log_debug
+async def read_cached_items(
+    db_session: AsyncSession,
+    model: type[CachedItem],
+    ids: list[int] | None = None,
+) -> list[CachedItem]:
+    """Прочитать закешированные записи KudaGo
+    Args:
+        db_session (AsyncSession): сессия для работы с базой
+        model (type[CachedItem]): модель кеша (CachedEvent, CachedPlace, ...)
+        ids (list[int] | None): только эти id, по умолчанию все записи
+    Returns:
+        list[CachedItem]: записи в порядке выдачи KudaGo
+    """
+    stmt = select(model).order_by(model.position)
+    if ids is not None:
+        stmt = stmt.where(model.id.in_(ids))
+    result = await db_session.execute(stmt)
+    return list(result.scalars().all())
+
+
+@log_debug
+async def save_cached_items(
+    db_session: AsyncSession,
+    model: type[CachedItem],
+    items: list[dict],
+    replace: bool = True,
+) -> datetime:
+    """Сохранить записи KudaGo в кеш
+    Записи без id пропускаются. Существующие записи обновляются,
+    вместе с содержимым сохраняется его хеш и время получения.
+    Args:
+        db_session (AsyncSession): сессия для работы с базой
+        model (type[CachedItem]): модель кеша
+        items (list[dict]): записи в порядке выдачи KudaGo
+        replace (bool): удалить записи, которых нет в items (снимок списка)
+    Returns:
+        datetime: время получения, записанное в fetched_at
+    """
+    fetched_at = utcnow()
+    rows = [
+        {
+            "id": item["id"],
+            "position": position,
+            "payload": item,
+            "content_hash": content_hash(item),
+            "fetched_at": fetched_at,
+        }
+        for position, item in enumerate(items)
+        if item.get("id") is not None
+    ]
+    try:
+        if replace:
+            await db_session.execute(
+                delete(model).where(model.id.not_in([row["id"] for row in rows]))
+            )
+        if rows:
+            stmt = upsert_stmt(db_session, model)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[model.id],
+                set_={
+                    "position": stmt.excluded.position,
+                    "payload": stmt.excluded.payload,
+                    "content_hash": stmt.excluded.content_hash,
+                    "fetched_at": stmt.excluded.fetched_at,
+                },
+            )
+            await db_session.execute(stmt, rows)
+        await db_session.commit()
+    except SQLAlchemyError:
+        await db_session.rollback()
+        raise
+    return fetched_at
+
+
 @log_debug
-async def get_chat_list(db_session: AsyncSession) -> list[Chat]:
-    """Получить список чатов
+async def read_file_ids(db_session: AsyncSession) -> dict[str, str]:
+    """Прочитать сохранённые file_id картинок
     Args:
         db_session (AsyncSession): сессия для работы с базой
     Returns:
-        list[Chats]:
-            [{
-                chat_id: chat_id,
-                created_at: YYYY-MM_DDTHH:MM:SS
-            },]
+        dict[str, str]: {адрес картинки: file_id в Telegram}
     """
+    result = await db_session.execute(
+        select(TelegramFile.image_url, TelegramFile.file_id)
+    )
+    return dict(result.tuples().all())
+
+
+@log_debug
+async def save_file_id(db_session: AsyncSession, image_url: str, file_id: str) -> None:
+    """Сохранить file_id картинки
+    Args:
+        db_session (AsyncSession): сессия для работы с базой
+        image_url (str): адрес картинки
+        file_id (str): идентификатор файла в Telegram
+    """
+    stmt = upsert_stmt(db_session, TelegramFile).values(
+        image_url=image_url, file_id=file_id
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TelegramFile.image_url], set_={"file_id": file_id}
+    )
     try:
-        chat_list = await db_session.execute(select(Chat))
-        return list(chat_list.scalars().all())
+        await db_session.execute(stmt)
+        await db_session.commit()
     except SQLAlchemyError:
-        raise HTTPException(status_code=500, detail="Ошибка при обращении к базе")
+        await db_session.rollback()
+        raise
+
+
+@log_debug
+async def delete_file_id(
+    db_session: AsyncSession, image_url: str, file_id: str
+) -> None:
+    """Удалить file_id картинки, если он не изменился с момента чтения
+    Args:
+        db_session (AsyncSession): сессия для работы с базой
+        image_url (str): адрес картинки
+        file_id (str): идентификатор, который Telegram отверг
+    """
+    stmt = delete(TelegramFile).where(
+        TelegramFile.image_url == image_url, TelegramFile.file_id == file_id
+    )
+    try:
+        await db_session.execute(stmt)
+        await db_session.commit()
+    except SQLAlchemyError:
+        await db_session.rollback()
+        raise
+
+
+@log_debug
+async def save_digest(db_session: AsyncSession, messages: list[dict]) -> str:
+    """Сохранить снимок дайджеста для outbox
+    Идентификатор - дата и хеш содержимого, поэтому повторное сохранение
+    того же дайджеста в тот же день ничего не меняет.
+    Args:
+        db_session (AsyncSession): сессия для работы с базой
+        messages (list[dict]): [{"text": ..., "image": ...}] в порядке отправки
+    Returns:
+        str: идентификатор дайджеста
+    """
+    digest_id = f"{utcnow():%Y%m%d}-{content_hash({'messages': messages})[:16]}"
+    stmt = (
+        upsert_stmt(db_session, Digest)
+        .values(id=digest_id, messages=messages)
+        .on_conflict_do_nothing(index_elements=[Digest.id])
+    )
+    try:
+        await db_session.execute(stmt)
+        await db_session.commit()
+    except SQLAlchemyError:
+        await db_session.rollback()
+        raise
+    return digest_id
+
+
+@log_debug
+async def read_digest(db_session: AsyncSession, digest_id: str) -> Digest | None:
+    """Прочитать снимок дайджеста
+    Args:
+        db_session (AsyncSession): сессия для работы с базой
+        digest_id (str): идентификатор дайджеста
+    Returns:
+        Digest | None: дайджест или None, если он уже удалён
+    """
+    return await db_session.get(Digest, digest_id)
+
+
+@log_debug
+async def has_due_chats(db_session: AsyncSession, now: datetime) -> bool:
+    """Есть ли активные чаты, которым пора отправить дайджест"""
+    stmt = select(Chat.chat_id).where(Chat.is_active, Chat.next_delivery_at <= now)
+    return await db_session.scalar(stmt.limit(1)) is not None
+
+
+@log_debug
+async def enqueue_due_outbox(
+    db_session: AsyncSession,
+    digest_id: str,
+    now: datetime,
+    chunk_size: int | None = None,
+) -> int:
+    """Поставить дайджест в outbox для чатов, у которых наступило время доставки
+    Чаты выбираются по индексу next_delivery_at страницами. Для каждой
+    страницы в одной транзакции добавляются доставки и вычисляется
+    следующий момент доставки с учётом часового пояса чата, так что
+    чат попадает в outbox один раз в сутки.
+    Args:
+        db_session (AsyncSession): сессия для работы с базой
+        digest_id (str): идентификатор дайджеста
+        now (datetime): текущее время в UTC
+        chunk_size (int): размер страницы, по умолчанию config.chat_page_size
+    Returns:
+        int: число добавленных доставок
+    """
+    chunk_size = chunk_size or config.chat_page_size
+    queued = 0
+    while True:
+        stmt = (
+            select(Chat.chat_id, Chat.delivery_time, Chat.timezone)
+            .where(Chat.is_active, Chat.next_delivery_at <= now)
+            .order_by(Chat.next_delivery_at)
+            .limit(chunk_size)
+        )
+        try:
+            chunk = (await db_session.execute(stmt)).all()
+            if not chunk:
+                return queued
+            insert_stmt = (
+                upsert_stmt(db_session, Outbox)
+                .values(
+                    [
+                        {"chat_id": chat_id, "digest_id": digest_id}
+                        for chat_id, _, _ in chunk
+                    ]
+                )
+                .on_conflict_do_nothing(
+                    index_elements=[Outbox.chat_id, Outbox.digest_id]
+                )
+            )
+            queued += (await db_session.execute(insert_stmt)).rowcount
+            await db_session.execute(
+                update(Chat),
+                [
+                    {
+                        "chat_id": chat_id,
+                        "next_delivery_at": next_delivery_at(
+                            delivery_time, timezone, now
+                        ),
+                    }
+                    for chat_id, delivery_time, timezone in chunk
+                ],
+            )
+            await db_session.commit()
+        except SQLAlchemyError:
+            await db_session.rollback()
+            raise
+
+
+@log_debug
+async def set_delivery_time(
+    db_session: AsyncSession,
+    chat_id: int,
+    delivery_time: str | None,
+    timezone: str | None,
+) -> Chat | HTTPException:
+    """Задать время и часовой пояс доставки для чата
+    Args:
+        db_session (AsyncSession): сессия для работы с базой
+        chat_id (int): идентификатор чата
+        delivery_time (str | None): ЧЧ:ММ или None - по умолчанию
+        timezone (str | None): часовой пояс IANA или None - по умолчанию
+    Returns:
+        Chat: чат с пересчитанным next_delivery_at
+        HTTPException: Ошибка 404
+    """
+    chat = await read_chat(db_session, chat_id)
+    chat.delivery_time = delivery_time
+    chat.timezone = timezone
+    chat.next_delivery_at = next_delivery_at(delivery_time, timezone)
+    try:
+        await db_session.commit()
+    except SQLAlchemyError:
+        await db_session.rollback()
+        raise HTTPException(status_code=500, detail="Ошибка при обновлении базы")
+    return chat
+
+
+@log_debug
+async def claim_outbox(
+    db_session: AsyncSession,
+    owner: str,
+    limit: int | None = None,
+    shard: int | None = None,
+    shards: int = 1,
+) -> list[Outbox]:
+    """Взять в аренду доставки, которые пора выполнить
+    Свободными считаются доставки без аренды или с истёкшей арендой
+    (экземпляр, который их выполнял, упал). Отбор и захват выполняются
+    одним UPDATE, в PostgreSQL строки, захваченные другими экземплярами,
+    пропускаются через FOR UPDATE SKIP LOCKED. Доставки в чаты, удалённые
+    или отключённые после постановки в outbox, не выдаются.
+    Args:
+        db_session (AsyncSession): сессия для работы с базой
+        owner (str): идентификатор экземпляра
+        limit (int): размер пачки, по умолчанию config.outbox_claim_size
+        shard (int | None): брать только чаты, у которых неотрицательный
+            остаток chat_id по модулю shards равен shard
+        shards (int): число шардов
+    Returns:
+        list[Outbox]: захваченные доставки по возрастанию id
+    """
+    now = utcnow()
+    candidates = (
+        select(Outbox.id)
+        .join(Chat, Chat.chat_id == Outbox.chat_id)
+        .where(
+            Chat.is_active,
+            Outbox.status == "pending",
+            Outbox.next_attempt_at <= now,
+            or_(Outbox.lease_until.is_(None), Outbox.lease_until < now),
+        )
+        .order_by(Outbox.id)
+        .limit(limit or config.outbox_claim_size)
+    )
+    if shard is not None and shards > 1:
+        # % в SQL сохраняет знак делимого, а id групп отрицательные
+        candidates = candidates.where(
+            (Outbox.chat_id % shards + shards) % shards == shard
+        )
+    if db_session.bind.dialect.name == "postgresql":
+        candidates = candidates.with_for_update(skip_locked=True, of=Outbox)
+    stmt = (
+        update(Outbox)
+        .where(Outbox.id.in_(candidates.scalar_subquery()))
+        .values(
+            lease_owner=owner,
+            lease_until=now + timedelta(seconds=config.outbox_lease_seconds),
+        )
+        .returning(Outbox)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        rows = list((await db_session.scalars(stmt)).all())
+        await db_session.commit()
+    except SQLAlchemyError:
+        await db_session.rollback()
+        raise
+    db_session.expunge_all()
+    return sorted(rows, key=lambda row: row.id)
+
+
+@log_debug(sample_rate=0.01)
+async def update_outbox(db_session: AsyncSession, outbox_id: int, **values) -> None:
+    """Обновить доставку: прогресс, статус или время следующей попытки
+    Args:
+        db_session (AsyncSession): сессия для работы с базой
+        outbox_id (int): идентификатор доставки
+        values: новые значения столбцов
+    """
+    try:
+        await db_session.execute(
+            update(Outbox).where(Outbox.id == outbox_id).values(**values)
+        )
+        await db_session.commit()
+    except SQLAlchemyError:
+        await db_session.rollback()
+        raise
+
+
+@log_debug
+async def delete_old_outbox(db_session: AsyncSession, days: int) -> int:
+    """Удалить доставки и дайджесты старше days дней
+    Args:
+        db_session (AsyncSession): сессия для работы с базой
+        days (int): срок хранения
+    Returns:
+        int: число удалённых доставок
+    """
+    cutoff = utcnow() - timedelta(days=days)
+    try:
+        result = await db_session.execute(
+            delete(Outbox).where(Outbox.created_at < cutoff)
+        )
+        await db_session.execute(
+            delete(Digest).where(
+                Digest.created_at < cutoff,
+                Digest.id.not_in(select(Outbox.digest_id)),
+            )
+        )
+        await db_session.commit()
+    except SQLAlchemyError:
+        await db_session.rollback()
+        raise
+    return result.rowcount
+
+
+@log_debug
+async def acquire_lock(
+    db_session: AsyncSession, name: str, owner: str, ttl: int
+) -> bool:
+    """Взять или продлить блокировку
+    Блокировка переходит к новому владельцу, только если срок
+    у текущего истёк.
+    Args:
+        db_session (AsyncSession): сессия для работы с базой
+        name (str): имя блокировки
+        owner (str): идентификатор экземпляра
+        ttl (int): срок блокировки, с
+    Returns:
+        bool: True, если блокировка принадлежит owner
+    """
+    now = utcnow()
+    stmt = upsert_stmt(db_session, SchedulerLock).values(
+        name=name, owner=owner, locked_until=now + timedelta(seconds=ttl)
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SchedulerLock.name],
+        set_={"owner": owner, "locked_until": stmt.excluded.locked_until},
+        where=or_(SchedulerLock.owner == owner, SchedulerLock.locked_until < now),
+    ).returning(SchedulerLock.owner)
+    try:
+        result = await db_session.scalar(stmt)
+        await db_session.commit()
+    except SQLAlchemyError:
+        await db_session.rollback()
+        raise
+    return result == owner
+
+
+@log_debug
+async def release_lock(db_session: AsyncSession, name: str, owner: str) -> None:
+    """Отпустить блокировку, если она принадлежит owner
+    Args:
+        db_session (AsyncSession): сессия для работы с базой
+        name (str): имя блокировки
+        owner (str): идентификатор экземпляра
+    """
+    try:
+        await db_session.execute(
+            delete(SchedulerLock).where(
+                SchedulerLock.name == name, SchedulerLock.owner == owner
+            )
+        )
+        await db_session.commit()
+    except SQLAlchemyError:
+        await db_session.rollback()
+        raise
+
+
+@log_debug
+async def read_seen_items(
+    db_session: AsyncSession, chat_ids: list[int]
+) -> dict[int, bytes]:
+    """Прочитать отпечатки доставленных элементов для нескольких чатов
+    Args:
+        db_session (AsyncSession): сессия для работы с базой
+        chat_ids (list[int]): идентификаторы чатов
+    Returns:
+        dict[int, bytes]: {chat_id: упакованные отпечатки}, чатов без
+        доставок в словаре нет
+    """
+    seen = {}
+    for batch in batched_ids(chat_ids):
+        result = await db_session.execute(
+            select(ChatSeen.chat_id, ChatSeen.items).where(ChatSeen.chat_id.in_(batch))
+        )
+        seen.update(result.tuples().all())
+    return seen
+
+
+@log_debug(sample_rate=0.01)
+async def save_seen_items(db_session: AsyncSession, chat_id: int, items: bytes) -> None:
+    """Сохранить отпечатки доставленных элементов чата
+    Args:
+        db_session (AsyncSession): сессия для работы с базой
+        chat_id (int): идентификатор чата
+        items (bytes): упакованные отпечатки
+    """
+    stmt = upsert_stmt(db_session, ChatSeen).values(chat_id=chat_id, items=items)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ChatSeen.chat_id],
+        set_={"items": items, "updated_at": utcnow()},
+    )
+    try:
+        await db_session.execute(stmt)
+        await db_session.commit()
+    except SQLAlchemyError:
+        await db_session.rollback()
+        raise
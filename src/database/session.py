@@ -1,11 +1,58 @@
 from src.core.config import config
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 
-engine = create_async_engine(config.db_url, echo=True, future=True)
+
+def engine_options(db_url: str) -> dict:
+    """Параметры create_async_engine из настроек
+    Для SQLite в памяти параметры пула не передаются: SQLAlchemy
+    использует для неё пул с одним соединением.
+    """
+    url = make_url(db_url)
+    options = {
+        "echo": config.db_echo,
+        "pool_pre_ping": config.db_pool_pre_ping,
+        "future": True,
+    }
+    in_memory = url.get_backend_name() == "sqlite" and url.database in (
+        None,
+        "",
+        ":memory:",
+    )
+    if not in_memory:
+        options.update(
+            pool_size=config.db_pool_size,
+            max_overflow=config.db_max_overflow,
+            pool_timeout=config.db_pool_timeout,
+            pool_recycle=config.db_pool_recycle,
+        )
+    return options
+
+
+engine = create_async_engine(config.db_url, **engine_options(config.db_url))
+
+
+if engine.dialect.name == "sqlite":
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+        """Настроить каждое новое соединение SQLite
+        WAL позволяет читать во время записи, synchronous=NORMAL в режиме
+        WAL безопасен и заметно ускоряет коммиты, busy_timeout заставляет
+        писателей ждать блокировку вместо ошибки "database is locked".
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={config.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={config.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(config.sqlite_busy_timeout)}")
+        cursor.execute(f"PRAGMA cache_size={int(config.sqlite_cache_size)}")
+        cursor.close()
+
 
 async_session = async_sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
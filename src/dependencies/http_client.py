@@ -1,8 +1,53 @@
-from aiohttp import ClientSession
+from aiohttp import ClientSession, TCPConnector
+from src.core.config import config
+
+HEADERS = {
+    "User-Agent": "FastAPIEventNotifyBot/1.0",
+    "Accept": "application/json",
+}
 
 
 class HttpClient:
+    """Общие пулы соединений приложения
+
+    Для Telegram и KudaGo отдельные сессии со своими TCPConnector,
+    так что всплеск рассылки не занимает соединения, нужные для сбора
+    дайджеста, и наоборот. Соединения и DNS кешируются между запусками
+    планировщика, обработкой вебхука и запросами к API.
+    """
+
     session: ClientSession = None
+    kudago_session: ClientSession = None
+
+    @staticmethod
+    def create_session(limit: int, limit_per_host: int) -> ClientSession:
+        connector = TCPConnector(
+            limit=limit,
+            limit_per_host=limit_per_host,
+            ttl_dns_cache=config.http_dns_cache_ttl,
+            keepalive_timeout=config.http_keepalive_timeout,
+        )
+        return ClientSession(
+            connector=connector, timeout=config.get_timeout(), headers=HEADERS
+        )
+
+    async def start(self) -> None:
+        """Открыть пулы, если они ещё не открыты"""
+        if self.session is None:
+            self.session = self.create_session(
+                config.tg_pool_limit, config.tg_pool_limit_per_host
+            )
+        if self.kudago_session is None:
+            self.kudago_session = self.create_session(
+                config.kudago_pool_limit, config.kudago_pool_limit_per_host
+            )
+
+    async def close(self) -> None:
+        """Закрыть пулы и все соединения в них"""
+        for session in (self.session, self.kudago_session):
+            if session is not None:
+                await session.close()
+        self.session = self.kudago_session = None
 
 
 http_client = HttpClient()
@@ -10,7 +55,7 @@ http_client = HttpClient()
 
 async def get_aiohttp_session() -> ClientSession:
     """
-    Возвращает общую асинхронную HTTP-сессию.
+    Возвращает общую асинхронную HTTP-сессию для Telegram.
 
     Используется как зависимость (Dependency) в эндпоинтах FastAPI.
     Сессия управляется жизненным циклом приложения (lifespan), что позволяет
@@ -20,3 +65,13 @@ async def get_aiohttp_session() -> ClientSession:
         aiohttp.ClientSession: Глобальный объект асинхронной сессии.
     """
     return http_client.session
+
+
+async def get_kudago_session() -> ClientSession:
+    """
+    Возвращает общую асинхронную HTTP-сессию для KudaGo.
+
+    Returns:
+        aiohttp.ClientSession: Сессия с отдельным пулом соединений KudaGo.
+    """
+    return http_client.kudago_session
@@ -1,22 +1,42 @@
 import aiohttp
 import sys
+import time
 import uvicorn
 
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
-from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse, Response
+from fastapi import Request
+from fastapi.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 from src.core.config import config
 from src.core.logger_setup import setup_app_logging
 from src.dependencies.http_client import get_aiohttp_session, http_client
 from src.dependencies.database import get_db
-from src.database.crud import create_chat_id, delete_chat, get_chat_list, read_chat
+from src.database.crud import (
+    create_chat_id,
+    create_chat_ids,
+    delete_chat,
+    delete_chats,
+    iter_chat_id_chunks,
+    read_chat,
+)
+from src.database.session import async_session
 from src.models.chats import Chat
-from src.services.api_telegram import check_bot, send_message, set_webhook
-from src.services.event_notifier import send_event_response
-from src.services.scheduler import scheduler, background_notification
+from src.services.api_telegram import check_bot, set_webhook
+from src.services.bot_commands import update_dedup, update_queue
+from src.services.scheduler import add_delivery_jobs, leader, scheduler
 from src.schemas.tg_schema import CheckBotSchema
-from src.schemas.endpoint_schema import AddToDBSchema
+from src.schemas.endpoint_schema import (
+    AddToDBSchema,
+    BulkChatResult,
+    BulkResultSchema,
+)
+from src.utils.chat_ids_input import read_chat_id_batches
+from src.utils.metrics import registry, webhook_latency, webhook_requests
 from sqlalchemy.ext.asyncio import AsyncSession
 
 # from src.utils.get_chat_id import inject_chat_id
@@ -27,13 +47,7 @@ async def lifespan(app: FastAPI) -> None:
     """Управление ресурсами"""
     listener = setup_app_logging()
     listener.start()
-    header = {
-        "User-Agent": "FastAPIEventNotifyBot/1.0",
-        "Accept": "application/json",
-    }
-    http_client.session = aiohttp.ClientSession(
-        timeout=config.get_timeout(), headers=header
-    )
+    await http_client.start()
     webhook_url = sys.argv[1] if len(sys.argv) > 1 else "https://127.0.0.1"
     try:
         status = await set_webhook(http_client.session, webhook_url)
@@ -41,14 +55,21 @@ async def lifespan(app: FastAPI) -> None:
     except Exception as e:
         print(f"Ошибка установки вебхука: {e}")
 
-    scheduler.add_job(background_notification, "cron", hour=12, minute=0)
+    update_dedup.load()
+    update_queue.start()
+    if config.app_delivery:
+        add_delivery_jobs(scheduler)
     scheduler.start()
     print("Планировщик запущен\n")
     try:
         yield
     finally:
-        await http_client.session.close()
+        await update_queue.stop()
+        update_dedup.save()
         scheduler.shutdown()
+        await leader.release()
+        # задачи планировщика тоже используют общие пулы
+        await http_client.close()
         print("Планировщик остановлен\n")
         listener.stop()
 
@@ -83,6 +104,36 @@ async def add_chat(
     return AddToDBSchema(chat_id=new_chat.chat_id)
 
 
+@app.post(
+    "/add_bulk",
+    response_model=BulkResultSchema,
+    response_model_exclude_none=True,
+    responses={
+        400: {"description": "Некорректное тело запроса"},
+        422: {"description": "Некорректный идентификатор чата"},
+        500: {"description": "Ошибка при добавлении в базу"},
+    },
+)
+async def add_chats(
+    request: Request, session: AsyncSession = Depends(get_db)
+) -> BulkResultSchema:
+    """Добавить несколько id чатов в базу\n
+    Тело - JSON массив id или NDJSON (Content-Type: application/x-ndjson).
+    Для каждого id возвращается added, exists или reactivated (чат был
+    отключён после блокировки бота и включён снова), для некорректных
+    строк NDJSON - invalid с номером строки.
+    """
+    results = []
+    async for batch, invalid in read_chat_id_batches(request):
+        created = await create_chat_ids(session, batch) if batch else {}
+        results.extend(
+            BulkChatResult(chat_id=chat_id, result=result)
+            for chat_id, result in created.items()
+        )
+        results.extend(invalid)
+    return BulkResultSchema(total=len(results), results=results)
+
+
 @app.delete(
     "/delete_chat/{chat_id}",
     status_code=204,
@@ -99,6 +150,35 @@ async def deleted_chat(chat_id: int, db: AsyncSession = Depends(get_db)) -> Resp
     return Response(status_code=404)
 
 
+@app.post(
+    "/delete_bulk",
+    response_model=BulkResultSchema,
+    response_model_exclude_none=True,
+    responses={
+        400: {"description": "Некорректное тело запроса"},
+        422: {"description": "Некорректный идентификатор чата"},
+        500: {"description": "Ошибка при удалении из базы"},
+    },
+)
+async def deleted_chats(
+    request: Request, db: AsyncSession = Depends(get_db)
+) -> BulkResultSchema:
+    """Удалить несколько чатов из базы\n
+    Тело - JSON массив id или NDJSON (Content-Type: application/x-ndjson).
+    Для каждого id возвращается deleted или not_found, для некорректных
+    строк NDJSON - invalid с номером строки.
+    """
+    results = []
+    async for batch, invalid in read_chat_id_batches(request):
+        deleted = await delete_chats(db, batch) if batch else {}
+        results.extend(
+            BulkChatResult(chat_id=chat_id, result=result)
+            for chat_id, result in deleted.items()
+        )
+        results.extend(invalid)
+    return BulkResultSchema(total=len(results), results=results)
+
+
 @app.get(
     "/read_chat/{chat_id}",
     status_code=200,
@@ -115,70 +195,84 @@ async def get_chat(chat_id: int, db: AsyncSession = Depends(get_db)):
 
 @app.get(
     "/chat_list",
-    response_model=list[int],
     responses={
-        200: {"description": "Успешное обращение к базе"},
+        200: {
+            "description": "Успешное обращение к базе",
+            "content": {"application/json": {"schema": {"type": "array"}}},
+        },
         500: {"description": "Ошибка при обращении к базе"},
     },
     status_code=200,
 )
-async def chat_list(db: AsyncSession = Depends(get_db)) -> list[int]:
-    """Получить список id чатов"""
-    return [i.chat_id for i in await get_chat_list(db)]
+async def chat_list() -> StreamingResponse:
+    """Получить список id чатов\n
+    Список отдаётся потоком, страницы читаются из базы по мере отправки.
+    """
 
+    async def body():
+        yield "["
+        separator = ""
+        async with async_session() as db:
+            async for chunk in iter_chat_id_chunks(db, active_only=False):
+                yield separator + ",".join(map(str, chunk))
+                separator = ","
+        yield "]"
 
-@app.post("/webhook")
-async def webhook(
-    request: Request,
-    session: aiohttp.ClientSession = Depends(get_aiohttp_session),
-    db: AsyncSession = Depends(get_db),
-) -> JSONResponse:
-    """Основное взаимодействие с телеграм чатом"""
+    return StreamingResponse(body(), media_type="application/json")
+
+
+@app.post(
+    "/webhook",
+    responses={
+        200: {"description": "Обновление принято в обработку"},
+        400: {"description": "Некорректное тело запроса"},
+        503: {"description": "Очередь обновлений заполнена"},
+    },
+)
+async def webhook(request: Request) -> JSONResponse:
+    """Основное взаимодействие с телеграм чатом\n
+    Обновление ставится в очередь и обрабатывается в фоне,
+    Telegram получает ответ сразу. Повторно доставленные
+    обновления (тот же update_id) отбрасываются.
+    """
+    start_time = time.perf_counter()
     try:
         payload = await request.json()
-        if "message" in payload:
-            chat_id = payload["message"]["chat"]["id"]
-            tg_message = payload["message"]["text"]
-            if tg_message == "/start":
-                try:
-                    await create_chat_id(db, chat_id)
-                    await send_message(
-                        session,
-                        chat_id,
-                        "Чат добавлен в расписание, события каждый день",
-                    )
-                    await send_message(session, chat_id, "Подготовка первых событий")
-                    await send_event_response(session, chat_id)
-                except HTTPException as e:
-                    if e.status_code == 409:
-                        await send_message(
-                            session, chat_id, "Чат в расписание уже был добавлен"
-                        )
-                    else:
-                        raise e
-            elif tg_message == "/delete":
-                deleted = await delete_chat(db, chat_id)
-                if deleted:
-                    await send_message(session, chat_id, "Рассылка отменена")
-                else:
-                    await send_message(
-                        session, chat_id, "В списке рассылок нет текущего чата"
-                    )
-            elif tg_message == "/event":
-                await send_message(
-                    session, chat_id, "Собираем данные о событиях, минуту..."
-                )
-                await send_event_response(session, chat_id)
-            elif tg_message == "/help":
-                message = "/start - добавляет чат в расписание для ежедневной отправки сообщений о событияx\n"
-                message += "/delete - убирает чат из расписания\n"
-                message += "/event - подготавливает данные о событиях и однократно отправляет в чат\n"
-                message += "/help - печатает это сообщение"
-                await send_message(session, chat_id, message)
+        if not isinstance(payload, dict):
+            raise ValueError("update must be a JSON object")
     except Exception as e:
+        webhook_requests.inc("invalid")
         return JSONResponse(status_code=400, content={"error": str(e)})
+    update_id = payload.get("update_id")
+    if update_dedup.is_duplicate(update_id):
+        webhook_requests.inc("duplicate")
+        return JSONResponse(status_code=200, content={"ok": "duplicate"})
+    if not update_queue.submit(payload):
+        webhook_requests.inc("rejected")
+        return JSONResponse(status_code=503, content={"error": "queue is full"})
+    update_dedup.remember(update_id)
+    webhook_requests.inc("accepted")
+    webhook_latency.observe(time.perf_counter() - start_time)
     return JSONResponse(status_code=200, content={"ok": "worked"})
 
 
+@app.get("/webhook/stats", status_code=200)
+async def webhook_stats() -> dict:
+    """Состояние очереди обновлений: глубина, счётчики, задержки"""
+    return {
+        **update_queue.stats(),
+        "duplicates": update_dedup.duplicates,
+        "high_water_mark": update_dedup.high_water_mark,
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Метрики рассылки в текстовом формате Prometheus"""
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 if __name__ == "__main__":
     uvicorn.run("src.main:app", host="0.0.0.0", port=5000, reload=True)
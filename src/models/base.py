@@ -1,9 +1,20 @@
+from datetime import UTC, datetime
+from sqlalchemy import BigInteger, Integer
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.ext.declarative import declared_attr
 
+# id чатов Telegram длиннее 32 бит. В SQLite INTEGER и так 64-битный,
+# и INTEGER PRIMARY KEY должен остаться псевдонимом rowid
+ChatIdType = BigInteger().with_variant(Integer(), "sqlite")
+
 
 class Base(DeclarativeBase):
 
     @declared_attr.directive
     def __tablename__(cls) -> str:
         return cls.__name__.lower()
+
+
+def utcnow() -> datetime:
+    """Текущее время в UTC без tzinfo, в том же виде, что CURRENT_TIMESTAMP"""
+    return datetime.now(UTC).replace(tzinfo=None)
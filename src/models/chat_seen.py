@@ -0,0 +1,17 @@
+from datetime import datetime
+from src.models.base import Base, ChatIdType
+from sqlalchemy import LargeBinary, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class ChatSeen(Base):
+    """Отпечатки элементов дайджеста, уже доставленных в чат"""
+
+    chat_id: Mapped[int] = mapped_column(
+        ChatIdType, primary_key=True, autoincrement=False
+    )
+    # упакованный массив uint64, см. src.services.seen_items.SeenItems
+    items: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(), onupdate=func.now(), nullable=False
+    )
@@ -1,11 +1,22 @@
 from datetime import datetime
-from src.models.base import Base
-from sqlalchemy import func
+from src.models.base import Base, ChatIdType
+from sqlalchemy import String, func, true
 from sqlalchemy.orm import Mapped, mapped_column
 
 
 class Chat(Base):
-    chat_id: Mapped[int] = mapped_column(primary_key=True)
+    chat_id: Mapped[int] = mapped_column(ChatIdType, primary_key=True)
     created_at: Mapped[datetime] = mapped_column(
         server_default=func.now(), nullable=False
     )
+    is_active: Mapped[bool] = mapped_column(
+        server_default=true(), default=True, nullable=False
+    )
+    # причина отключения рассылки: blocked, chat_not_found
+    delivery_status: Mapped[str | None] = mapped_column(String(32))
+    status_changed_at: Mapped[datetime | None]
+    # ЧЧ:ММ и часовой пояс IANA, пустые - значения по умолчанию из настроек
+    delivery_time: Mapped[str | None] = mapped_column(String(5))
+    timezone: Mapped[str | None] = mapped_column(String(64))
+    # следующая доставка в UTC, по ней задача планировщика выбирает чаты
+    next_delivery_at: Mapped[datetime | None] = mapped_column(index=True)
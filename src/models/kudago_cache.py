@@ -0,0 +1,34 @@
+from datetime import datetime
+from src.models.base import Base
+from sqlalchemy import JSON, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class CachedItem:
+    """Общие поля закешированной записи KudaGo"""
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    position: Mapped[int] = mapped_column(default=0, nullable=False)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    fetched_at: Mapped[datetime] = mapped_column(nullable=False, index=True)
+
+
+class CachedEvent(CachedItem, Base):
+    pass
+
+
+class CachedPlace(CachedItem, Base):
+    pass
+
+
+class CachedMovie(CachedItem, Base):
+    pass
+
+
+class CachedNews(CachedItem, Base):
+    pass
+
+
+class CachedCollection(CachedItem, Base):
+    pass
@@ -0,0 +1,50 @@
+from datetime import datetime
+from src.models.base import Base, ChatIdType
+from sqlalchemy import JSON, ForeignKey, Index, String, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class Digest(Base):
+    """Снимок дайджеста, на который ссылаются записи outbox"""
+
+    # дата и хеш содержимого: один и тот же дайджест за день не дублируется
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    # [{"kind": ..., "key": ..., "text": ..., "image": ...}] в порядке отправки
+    messages: Mapped[list] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(), nullable=False
+    )
+
+
+class Outbox(Base):
+    """Доставка дайджеста в один чат"""
+
+    __table_args__ = (
+        UniqueConstraint("chat_id", "digest_id"),
+        Index("ix_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    chat_id: Mapped[int] = mapped_column(ChatIdType, nullable=False, index=True)
+    digest_id: Mapped[str] = mapped_column(
+        ForeignKey("digest.id", ondelete="CASCADE"), nullable=False
+    )
+    # номер следующего сообщения дайджеста, отправленные не повторяются
+    next_item: Mapped[int] = mapped_column(
+        default=0, server_default="0", nullable=False
+    )
+    attempts: Mapped[int] = mapped_column(default=0, server_default="0", nullable=False)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(), nullable=False
+    )
+    # pending, sent, failed, dead
+    status: Mapped[str] = mapped_column(
+        String(16), default="pending", server_default="pending", nullable=False
+    )
+    last_error: Mapped[str | None] = mapped_column(String(512))
+    # экземпляр, который сейчас выполняет доставку, и срок его аренды
+    lease_owner: Mapped[str | None] = mapped_column(String(128))
+    lease_until: Mapped[datetime | None]
+    created_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(), nullable=False
+    )
@@ -0,0 +1,12 @@
+from datetime import datetime
+from src.models.base import Base
+from sqlalchemy import String
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class SchedulerLock(Base):
+    """Блокировка задачи планировщика, которую держит один экземпляр"""
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    owner: Mapped[str] = mapped_column(String(128), nullable=False)
+    locked_until: Mapped[datetime] = mapped_column(nullable=False)
@@ -0,0 +1,12 @@
+from datetime import datetime
+from src.models.base import Base
+from sqlalchemy import String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class TelegramFile(Base):
+    image_url: Mapped[str] = mapped_column(String(2048), primary_key=True)
+    file_id: Mapped[str] = mapped_column(String(255), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(), nullable=False
+    )
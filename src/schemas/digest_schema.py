@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+from enum import StrEnum
+
+
+class DigestKind(StrEnum):
+    COLLECTION = "collection"
+    EVENT = "event"
+    MOVIE = "movie"
+    NEWS = "news"
+
+
+@dataclass(frozen=True, slots=True)
+class DigestItem:
+    """Элемент дайджеста с готовым текстом сообщения
+
+    Строится сразу из провалидированного ответа KudaGo, текст
+    собирается один раз при создании и дальше только читается.
+    key - постоянный идентификатор элемента ("event:123"): текст
+    меняется вместе с ближайшими датами, а key остаётся прежним.
+    """
+
+    kind: DigestKind
+    key: str
+    title: str
+    text: str
+    image: str | None = None
+    site_url: str | None = None
+
+    @classmethod
+    def build(
+        cls,
+        kind: DigestKind,
+        identity: int | str,
+        title: str,
+        *details: str | None,
+        image: str | None = None,
+        site_url: str | None = None,
+    ) -> "DigestItem":
+        """Собрать элемент, текст - непустые title, details и site_url,
+        каждое значение с новой строки
+        Args:
+            kind (DigestKind): тип элемента
+            identity (int | str): id в KudaGo или адрес страницы
+            title (str): заголовок
+            details (str | None): остальные строки сообщения по порядку
+            image (str | None): адрес картинки
+            site_url (str | None): ссылка на страницу KudaGo
+        Returns:
+            DigestItem: элемент дайджеста
+        """
+        text = "".join(f"{value}\n" for value in (title, *details, site_url) if value)
+        return cls(kind, f"{kind}:{identity}", title, text, image, site_url)
@@ -1,7 +1,20 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 
 
 class AddToDBSchema(BaseModel):
     result: Optional[str] = "added"
     chat_id: int
+
+
+class BulkChatResult(BaseModel):
+    chat_id: Optional[int] = None
+    result: str
+    # для invalid: номер строки NDJSON и причина
+    line: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class BulkResultSchema(BaseModel):
+    total: int
+    results: List[BulkChatResult]
@@ -28,6 +28,7 @@ class DefaultParam(BaseModel):
 
 
 class EventResults(BaseModel):
+    id: Optional[int] = None
     dates: List[DatesModel]
     description: str
     images: List[ImagesModel]
@@ -42,6 +43,7 @@ class GetPlacesResult(PlaceId):
 
 
 class GetCollectionsResult(BaseModel):
+    id: Optional[int] = None
     title: str
     site_url: str
 
@@ -54,6 +56,7 @@ class GetMovieListResult(BaseModel):
 
 
 class GetNewsResult(BaseModel):
+    id: Optional[int] = None
     title: str
     description: Optional[str] = None
     images: List[ImagesModel]
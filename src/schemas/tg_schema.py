@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Literal, Optional
 
 
 class CheckBotResult(BaseModel):
@@ -56,7 +56,7 @@ class TextMessageResult(SendResult):
 
 
 class SendMessageSchema(BaseModel):
-    ok: bool
+    ok: Literal[True]
     result: TextMessageResult
 
 
@@ -74,5 +74,35 @@ class SendPhotoResult(SendResult):
 
 
 class SendPhotoSchema(BaseModel):
-    ok: bool
+    ok: Literal[True]
     result: SendPhotoResult
+
+
+class PhotoFileId(BaseModel):
+    file_id: str
+    width: int
+    height: int
+
+
+class SendAckResult(BaseModel):
+    photo: Optional[list[PhotoFileId]] = None
+
+
+class SendAckSchema(BaseModel):
+    """Ответ sendMessage/sendPhoto без полной проверки:
+    только ok и file_id картинок, остальные поля пропускаются"""
+
+    ok: Literal[True]
+    result: SendAckResult
+
+
+class ResponseParameters(BaseModel):
+    retry_after: Optional[int] = None
+    migrate_to_chat_id: Optional[int] = None
+
+
+class ErrorSchema(BaseModel):
+    ok: Literal[False]
+    error_code: Optional[int] = None
+    description: Optional[str] = None
+    parameters: Optional[ResponseParameters] = None
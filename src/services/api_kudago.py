@@ -1,16 +1,53 @@
 import aiohttp
+import asyncio
+import bisect
+import functools
+import logging
+import time
 
 from asyncio import gather
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 from src.core.config import config
+from src.database.crud import read_cached_items, save_cached_items
+from src.database.session import async_session
+from src.models.base import utcnow
+from src.models.kudago_cache import (
+    CachedCollection,
+    CachedEvent,
+    CachedMovie,
+    CachedNews,
+    CachedPlace,
+)
+from src.schemas.digest_schema import DigestItem, DigestKind
 from src.schemas.kudago_schema import (
+    DatesModel,
+    DefaultParam,
     SchemaGetEvents,
     SchemaGetPlaces,
     SchemaGetCollections,
     SchemaGetMovieList,
     SchemaGetNews,
 )
+from sqlalchemy.exc import SQLAlchemyError
+from typing import AsyncIterator, Sequence, TypeVar
+from src.utils.cache import TTLCache
 from src.utils.debug_logs import log_debug
+from src.utils.metrics import kudago_latency, kudago_requests
+
+logger = logging.getLogger(__name__)
+
+SchemaT = TypeVar("SchemaT", bound=DefaultParam)
+
+digest_cache = TTLCache(
+    ttl=config.digest_cache_ttl,
+    refresh_ahead=config.digest_cache_refresh_ahead,
+    name="digest",
+)
+# места меняются редко, поэтому живут в кеше намного дольше дайджеста
+place_cache = TTLCache(
+    ttl=config.place_cache_ttl, maxsize=config.place_cache_size, name="place"
+)
 
 
 @log_debug
@@ -22,49 +59,194 @@ def to_unixtime() -> int:
     return int(datetime.now().timestamp())
 
 
+@functools.lru_cache(maxsize=4096)
+def format_timestamp(unixtime: int) -> str:
+    """Строка даты для unixtime, результат кешируется:
+    у событий много повторяющихся дат, а fromtimestamp недешёвый"""
+    return str(datetime.fromtimestamp(unixtime))
+
+
 @log_debug
 def to_datetime(unixtime: int) -> str:
     """Преобразовать unixtime в datetime.
     Returns:
         str: возвращается строка вормате "2025-11-21 12:12:25"
     """
-    return str(datetime.fromtimestamp(unixtime))
+    return format_timestamp(unixtime)
+
+
+def _date_start(date: DatesModel) -> int:
+    return date.start
 
 
 @log_debug
-def date_event(dates: list[dict[str, int]]) -> str:
+def date_event(dates: Sequence[DatesModel]) -> str:
     """Преобразовать список дат в строку
-    Обходит список дат, преобразует из unixtime в datetime и сохраняет в строку
+    Прошедшие даты пропускаются двоичным поиском: KudaGo отдаёт даты
+    по возрастанию start, а у постоянных событий их бывают сотни.
     Args:
-        dates (list): список словарей с датами
+        dates (Sequence[DatesModel]): даты события по возрастанию start
         [
-        {'end': 1622448000, 'start': 1618732800},
-        {'end': 1633593600, 'start': 1633593600},
-        {'end': 1633692600, 'start': 1633692600},
+        DatesModel(start=1618732800, end=1622448000),
+        DatesModel(start=1633593600, end=1633593600),
         ...
         ]
     Returns:
         str: С 2025-12-13 00:00:00 по 2026-01-12 00:00:00
     """
-    result = []
-    now_unix = int(datetime.now().timestamp())
+    now_unix = int(time.time())
+    first = bisect.bisect_left(dates, now_unix, key=_date_start)
+    return "\n".join(
+        f"С {format_timestamp(date.start)} по {format_timestamp(date.end)}"
+        for date in dates[first:]
+    )
+
+
+async def get_page(
+    session: aiohttp.ClientSession,
+    endpoint: str,
+    schema: type[SchemaT],
+    params: dict | None = None,
+    url: str | None = None,
+) -> SchemaT:
+    """GET запрос к KudaGo с учётом числа и времени запросов в метриках
+    Ответ проверяется по схеме прямо из байтов, без промежуточного dict.
+    Args:
+        session (ClientSession): http сессия
+        endpoint (str): events, places, lists, movies или news
+        schema (type): схема ответа
+        params (dict): параметры запроса
+        url (str): полный адрес со строкой запроса (ссылка next),
+            тогда params не нужны
+    Returns:
+        SchemaT: страница ответа
+    """
+    status = "error"
+    start_time = time.perf_counter()
+    try:
+        async with session.get(
+            url or f"{config.get_full_url()}/{endpoint}", params=params
+        ) as resp:
+            status = str(resp.status)
+            return schema.model_validate_json(await resp.read())
+    finally:
+        kudago_requests.inc(endpoint, status)
+        kudago_latency.observe(time.perf_counter() - start_time, endpoint)
 
-    for date_dict in dates:
-        start_unix = date_dict.get("start")
-        if start_unix is None or start_unix < now_unix:
-            continue
-        end_unix = date_dict.get("end", start_unix)
 
-        start_dt = datetime.fromtimestamp(start_unix)
-        end_dt = datetime.fromtimestamp(end_unix)
-        result.append(f"С {start_dt} по {end_dt}")
+@dataclass(frozen=True, slots=True)
+class PageBudget:
+    """Ограничения обхода страниц; None - без ограничения"""
 
-    return "\n".join(result) if result else ""
+    max_items: int | None = None
+    max_pages: int | None = None
+    max_seconds: float | None = None
+
+
+async def paginate(
+    session: aiohttp.ClientSession,
+    endpoint: str,
+    params: dict,
+    schema: type[SchemaT],
+    budget: PageBudget | None = None,
+) -> AsyncIterator[SchemaT]:
+    """Обойти страницы списка KudaGo по ссылкам next
+    Следующая страница запрашивается, пока вызывающий обрабатывает
+    текущую, так что обход не ждёт последовательных запросов.
+    Обход останавливается, когда кончились страницы или исчерпан
+    бюджет по элементам, страницам или времени; лишние элементы
+    последней страницы отбрасываются.
+    Args:
+        session (ClientSession): http сессия
+        endpoint (str): events, places, lists, movies или news
+        params (dict): параметры первой страницы
+        schema (type): схема ответа
+        budget (PageBudget): ограничения, по умолчанию из настроек
+    Yields:
+        SchemaT: очередная страница
+    """
+    budget = budget or PageBudget(
+        max_pages=config.kudago_max_pages, max_seconds=config.kudago_fetch_budget
+    )
+    deadline = (
+        time.monotonic() + budget.max_seconds
+        if budget.max_seconds is not None
+        else None
+    )
+    pages = items = 0
+    task = asyncio.ensure_future(get_page(session, endpoint, schema, params))
+    try:
+        while task is not None:
+            page = await task
+            task = None
+            pages += 1
+            if budget.max_items is not None:
+                page.results = (page.results or [])[: budget.max_items - items]
+            items += len(page.results or [])
+            can_continue = (
+                page.next is not None
+                and (budget.max_items is None or items < budget.max_items)
+                and (budget.max_pages is None or pages < budget.max_pages)
+                and (deadline is None or time.monotonic() < deadline)
+            )
+            if can_continue:
+                task = asyncio.ensure_future(
+                    get_page(session, endpoint, schema, url=page.next)
+                )
+            yield page
+    finally:
+        if task is not None:
+            task.cancel()
+
+
+async def fetch_pages(
+    session: aiohttp.ClientSession,
+    endpoint: str,
+    params: dict,
+    schema: type[SchemaT],
+    budget: PageBudget | None = None,
+) -> SchemaT:
+    """Собрать страницы списка KudaGo в один ответ
+    Args:
+        session (ClientSession): http сессия
+        endpoint (str): events, places, lists, movies или news
+        params (dict): параметры первой страницы
+        schema (type): схема ответа
+        budget (PageBudget): ограничения обхода
+    Returns:
+        SchemaT: ответ с результатами всех полученных страниц
+    """
+    result = None
+    async for page in paginate(session, endpoint, params, schema, budget):
+        if result is None:
+            result = page
+        else:
+            result.results.extend(page.results or [])
+            result.next = page.next
+    return result
+
+
+def page_params(params: dict, max_items: int | None) -> tuple[dict, PageBudget]:
+    """Параметры первой страницы и бюджет обхода для max_items элементов"""
+    page_size = config.kudago_page_size
+    if max_items is not None:
+        page_size = min(page_size, max_items)
+    budget = PageBudget(
+        max_items=max_items,
+        max_pages=config.kudago_max_pages,
+        max_seconds=config.kudago_fetch_budget,
+    )
+    return {"page": 1, "page_size": page_size, **params}, budget
 
 
 @log_debug
-async def get_events(session: aiohttp.ClientSession) -> SchemaGetEvents:
+async def get_events(
+    session: aiohttp.ClientSession, max_items: int | None = 5
+) -> SchemaGetEvents:
     """Получить список мероприятий
+        Args:
+            max_items (int | None): сколько событий получить, None - все
+            в пределах бюджета обхода страниц
         Returns:
             dict: Возвращается словарь
             в котором есть ключ results, это список
@@ -101,31 +283,31 @@ async def get_events(session: aiohttp.ClientSession) -> SchemaGetEvents:
         ]
     }
     """
-    param = {
-        "page": 1,
-        "page_size": 5,
-        "fields": "images,dates,title,place,description,price",
-        "location": "spb",
-        "actual_since": to_unixtime(),
-        "text_format": "text",
-    }
-    url = config.get_full_url()
-    async with session.get(f"{url}/events", params=param) as resp:
-        raw = await resp.json()
-    return SchemaGetEvents(**raw)
+    param, budget = page_params(
+        {
+            "fields": "id,images,dates,title,place,description,price",
+            "location": "spb",
+            "actual_since": to_unixtime(),
+            "text_format": "text",
+        },
+        max_items,
+    )
+    return await fetch_pages(session, "events", param, SchemaGetEvents, budget)
 
 
 @log_debug
 async def get_places(
-    session: aiohttp.ClientSession, place_id: int | None
+    session: aiohttp.ClientSession, place_ids: list[int]
 ) -> SchemaGetPlaces:
-    """Получить назвние и адрес места по id.
+    """Получить назвния и адреса мест по списку id.
+    Endpoint /places принимает список id через запятую,
+    поэтому все места запрашиваются одним запросом.
     Args:
-        place_id (int): id места
+        place_ids (list[int]): id мест, не больше places_chunk_size
     Returns:
-        dict: Возвращает словарь с адресом, именем места
+        dict: Возвращает словарь с адресами, именами мест
             {
-              "count": 1,
+              "count": 2,
               "next": null,
               "previous": null,
               "results": [
@@ -133,30 +315,107 @@ async def get_places(
                   "id": 336,
                   "title": "клуб А2",
                   "address": "просп. Медиков, д. 3"
+                },
+                {
+                  "id": 3037,
+                  "title": "Ленинградский зоопарк",
+                  "address": "Александровский парк, д. 1"
                 }
               ]
             }
     """
-    if place_id is None:
-        return {}
-    param = {
-        "page": 1,
-        "page_size": 1,
-        "fields": "id,title,address",
-        "text_format": "text",
-        "ids": place_id,
+    param, budget = page_params(
+        {
+            "fields": "id,title,address",
+            "text_format": "text",
+            "ids": ",".join(str(place_id) for place_id in place_ids),
+        },
+        len(place_ids),
+    )
+    return await fetch_pages(session, "places", param, SchemaGetPlaces, budget)
+
+
+@log_debug
+async def resolve_places(session: aiohttp.ClientSession, data: list) -> dict[int, str]:
+    """Получить места для всех событий
+    Собирает id мест из результатов SchemaGetEvents, берёт известные
+    места из place_cache, а остальные запрашивает пачками по
+    places_chunk_size параллельно.
+    Args:
+        session (ClientSession): http сессия
+        data (list): сырые результаты запросов к KudaGo
+    Returns:
+        dict[int, str]: {id места: "название, адрес"}
+    """
+    place_ids = {
+        event.place.id
+        for result in data
+        if isinstance(result, SchemaGetEvents)
+        for event in result.results
+        if event.place is not None and event.place.id is not None
     }
-    url = config.get_full_url()
-    async with session.get(f"{url}/places", params=param) as resp:
-        raw = await resp.json()
-    return SchemaGetPlaces(**raw)
+    places = {}
+    missing = []
+    for place_id in place_ids:
+        place = place_cache.get(place_id)
+        if place is None:
+            missing.append(place_id)
+        else:
+            places[place_id] = place
+    if not missing:
+        return places
+
+    # второй уровень - таблица cachedplace, переживающая рестарты
+    stale = {}
+    fresh_since = utcnow() - timedelta(seconds=config.place_cache_ttl)
+    async with async_session() as db:
+        rows = await read_cached_items(db, CachedPlace, missing)
+    for row in rows:
+        place = format_place(row.payload)
+        if row.fetched_at >= fresh_since:
+            place_cache.set(row.id, place)
+            places[row.id] = place
+        else:
+            stale[row.id] = place
+    missing = [place_id for place_id in missing if place_id not in places]
+
+    size = config.places_chunk_size
+    chunks = [missing[i : i + size] for i in range(0, len(missing), size)]
+    responses = await gather(
+        *(get_places(session, chunk) for chunk in chunks), return_exceptions=True
+    )
+    fetched = []
+    for response in responses:
+        if isinstance(response, BaseException):
+            logger.error(f"Ошибка получения мест: {response}")
+            continue
+        for result in response.results or []:
+            fetched.append(result.model_dump())
+            place = format_place(fetched[-1])
+            place_cache.set(result.id, place)
+            places[result.id] = place
+    if fetched:
+        async with async_session() as db:
+            await save_cached_items(db, CachedPlace, fetched, replace=False)
+    for place_id, place in stale.items():
+        places.setdefault(place_id, place)
+    return places
+
+
+def format_place(place: dict) -> str:
+    """Строка места для сообщения в виде "название, адрес"."""
+    return f"{place.get("title")}, {place.get("address")}"
 
 
 @log_debug
-async def get_collections(session: aiohttp.ClientSession) -> SchemaGetCollections:
+async def get_collections(
+    session: aiohttp.ClientSession, max_items: int | None = 2
+) -> SchemaGetCollections:
     """Получить список подборок редакции
     При тестировании от текущей даты, апи
     возвращает только две актуальных подборки.
+    Args:
+        max_items (int | None): сколько подборок получить, None - все
     Returns:
         dict: Возвращает словарь с результатами по событиям
             {
@@ -175,25 +434,21 @@ async def get_collections(session: aiohttp.ClientSession) -> SchemaGetCollection
               ]
             }
     """
-    param = {
-        "page": 1,
-        "page_size": 2,
-        "location": "spb",
-        "fields": "title,site_url",
-        "text_format": "text",
-    }
-    url = f"{config.get_full_url()}/lists"
-    async with session.get(url, params=param) as resp:
-        raw = await resp.json()
-    return SchemaGetCollections(**raw)
+    param, budget = page_params(
+        {"location": "spb", "fields": "id,title,site_url", "text_format": "text"},
+        max_items,
+    )
+    return await fetch_pages(session, "lists", param, SchemaGetCollections, budget)
 
 
 @log_debug
-async def get_movie_list(session: aiohttp.ClientSession) -> SchemaGetMovieList:
+async def get_movie_list(
+    session: aiohttp.ClientSession, max_items: int | None = 3
+) -> SchemaGetMovieList:
     """Получить список фильмов.
         Функция возвращает список словарей в колличестве
-        трёх штук, где есть описание фильма, его название,
-        дата публикации и ссылка на постер.
+        max_items штук (по умолчанию трёх), где есть описание
+        фильма, его название, дата публикации и ссылка на постер.
         Returns:
             dict: Пример возвращаемого словаря
     {
@@ -225,23 +480,25 @@ async def get_movie_list(session: aiohttp.ClientSession) -> SchemaGetMovieList:
     }
     }
     """
-    param = {
-        "page": 1,
-        "page_size": 3,
-        "fields": "id,title,description,images",
-        "location": "spb",
-        "text_format": "text",
-        "actual_since": to_unixtime(),
-    }
-    url = f"{config.get_full_url()}/movies"
-    async with session.get(url, params=param) as resp:
-        raw = await resp.json()
-    return SchemaGetMovieList(**raw)
+    param, budget = page_params(
+        {
+            "fields": "id,title,description,images",
+            "location": "spb",
+            "text_format": "text",
+            "actual_since": to_unixtime(),
+        },
+        max_items,
+    )
+    return await fetch_pages(session, "movies", param, SchemaGetMovieList, budget)
 
 
 @log_debug
-async def get_news(session: aiohttp.ClientSession) -> SchemaGetNews:
+async def get_news(
+    session: aiohttp.ClientSession, max_items: int | None = 1
+) -> SchemaGetNews:
     """Получить новости на сегодняшний день
+    Args:
+        max_items (int | None): сколько новостей получить, None - все
     Returns:
         dict: Пример вывода
         {'count': 1231,
@@ -265,95 +522,138 @@ async def get_news(session: aiohttp.ClientSession) -> SchemaGetNews:
               'site_url': 'https://kudago.com/all/news/24-noyabrya-kakoj-prazdnik/',
               'title': '24 ноября: какой праздник сегодня'}]}
     """
-    param = {
-        "page": 1,
-        "page_size": 1,
-        "fields": "title,description,images,site_url",
-        "actual_only": 1,
-        "location": "spb",
-        "text_format": "text",
-    }
-    url = f"{config.get_full_url()}/news"
-    async with session.get(url, params=param) as resp:
-        raw = await resp.json()
-    return SchemaGetNews(**raw)
+    param, budget = page_params(
+        {
+            "fields": "id,title,description,images,site_url",
+            "actual_only": 1,
+            "location": "spb",
+            "text_format": "text",
+        },
+        max_items,
+    )
+    return await fetch_pages(session, "news", param, SchemaGetNews, budget)
 
 
 @log_debug
 async def process_collect_data(
-    session: aiohttp.ClientSession, data: list[dict]
-) -> list[dict]:
+    session: aiohttp.ClientSession, data: list
+) -> list[DigestItem]:
     """Формирует полученные данные в список
-    Полученные данные по событиям, подготавливает и добавляет в список
+    Элементы дайджеста строятся прямо из провалидированных ответов,
+    текст сообщения собирается один раз при создании элемента.
     Args:
         session (ClientSession): http сессия
-        data (list[dict]): сырой список словарей с событиями
+        data (list): сырые результаты запросов к KudaGo
     Returns:
-        list[dict]: обработанный список словарей с событиями
+        list[DigestItem]: элементы дайджеста в порядке отправки
     """
-    data_list = []
+    places = await resolve_places(session, data)
+    items = []
     for result in data:
         # Список мероприятий
         if isinstance(result, SchemaGetCollections):
             for collect in result.results:
-                collect = collect.model_dump()
-                data_list.append(
-                    {"title": collect.get("title"), "site_url": collect.get("site_url")}
+                items.append(
+                    DigestItem.build(
+                        DigestKind.COLLECTION,
+                        collect.site_url,
+                        collect.title,
+                        site_url=collect.site_url,
+                    )
                 )
         # Список событий
         if isinstance(result, SchemaGetEvents):
-            for events in result.results:
-                event = events.model_dump()
-                try:
-                    place_id = event.get("place").get("id")
-                    place = await get_places(session, place_id)
-                    place = place.model_dump().get("results")[0]
-                    place = f"{place.get("title")}, {place.get("address")}"
-                except (TypeError, AttributeError, IndexError):
-                    place = ""
-
-                data_list.append(
-                    {
-                        "title": event.get("title"),
-                        "description": event.get("description"),
-                        "place": place,
-                        "price": event.get("price"),
-                        "image": event.get("images")[0].get("image"),
-                        "dates": date_event(event.get("dates")),
-                    }
+            for event in result.results:
+                place_id = event.place.id if event.place is not None else None
+                dates = date_event(event.dates)
+                items.append(
+                    DigestItem.build(
+                        DigestKind.EVENT,
+                        event.id if event.id is not None else event.title,
+                        event.title,
+                        event.description,
+                        places.get(place_id, ""),
+                        event.price,
+                        f"Дата проведения: {dates}" if dates else None,
+                        image=event.images[0].image,
+                    )
                 )
         # список фильмов
         if isinstance(result, SchemaGetMovieList):
             for movie in result.results:
-                movie = movie.model_dump()
-                data_list.append(
-                    {
-                        "title": movie.get("title"),
-                        "description": movie.get("description"),
-                        "image": movie.get("images")[0].get("image"),
-                    }
+                items.append(
+                    DigestItem.build(
+                        DigestKind.MOVIE,
+                        movie.id,
+                        movie.title,
+                        movie.description,
+                        image=movie.images[0].image,
+                    )
                 )
         # список новостей
         if isinstance(result, SchemaGetNews):
             for tidings in result.results:
-                tidings = tidings.model_dump()
-                data_list.append(
-                    {
-                        "title": tidings.get("title"),
-                        "description": tidings.get("description"),
-                        "image": tidings.get("images")[0].get("image"),
-                        "site_url": tidings.get("site_url"),
-                    }
+                items.append(
+                    DigestItem.build(
+                        DigestKind.NEWS,
+                        tidings.id if tidings.id is not None else tidings.site_url,
+                        tidings.title,
+                        tidings.description,
+                        image=tidings.images[0].image,
+                        site_url=tidings.site_url,
+                    )
                 )
-    return data_list
+    return items
 
 
-async def collect_data(session: aiohttp.ClientSession) -> list[dict]:
-    """Получаяет события, обрабатывает и возвращает списком"""
-    result = await gather(
-        get_collections(session),
-        get_events(session),
-        get_movie_list(session),
-        get_news(session),
-    )
+# источники дайджеста: модель кеша в базе, запрос к KudaGo, схема ответа
+DIGEST_SOURCES = (
+    (CachedCollection, get_collections, SchemaGetCollections),
+    (CachedEvent, get_events, SchemaGetEvents),
+    (CachedMovie, get_movie_list, SchemaGetMovieList),
+    (CachedNews, get_news, SchemaGetNews),
+)
+
+
+async def load_source(session: aiohttp.ClientSession, model, fetch, schema):
+    """Получить список из кеша в базе или из KudaGo
+    Свежие записи (моложе kudago_store_ttl) берутся из базы без запроса
+    к KudaGo. Иначе список запрашивается и сохраняется в базу, а если
+    KudaGo недоступно - используются устаревшие записи.
+    """
+    async with async_session() as db:
+        rows = await read_cached_items(db, model)
+    fresh_since = utcnow() - timedelta(seconds=config.kudago_store_ttl)
+    cached = schema(count=len(rows), results=[row.payload for row in rows])
+    if rows and all(row.fetched_at >= fresh_since for row in rows):
+        return cached
+    try:
+        result = await fetch(session)
+    except Exception as e:
+        if not rows:
+            raise
+        logger.warning(f"KudaGo недоступно, используется кеш {model.__name__}: {e}")
+        return cached
+    try:
+        async with async_session() as db:
+            await save_cached_items(
+                db, model, [item.model_dump() for item in result.results]
+            )
+    except SQLAlchemyError as e:
+        logger.error(f"Не удалось сохранить кеш {model.__name__}: {e}")
+    return result
+
+
+async def fetch_digest(session: aiohttp.ClientSession) -> list[DigestItem]:
+    """Собирает события из кеша в базе или KudaGo, обрабатывает и возвращает списком"""
+    result = await gather(*(load_source(session, *source) for source in DIGEST_SOURCES))
     return await process_collect_data(session, result)
+
+
+async def collect_data(session: aiohttp.ClientSession) -> list[DigestItem]:
+    """Получаяет события, обрабатывает и возвращает списком
+    Результат кешируется в digest_cache на digest_cache_ttl секунд,
+    одновременные запросы при промахе ждут одну общую загрузку.
+    Возвращаемый список общий для всех вызывающих и не должен изменяться.
+    """
+    return await digest_cache.get_or_load("digest", lambda: fetch_digest(session))
@@ -1,12 +1,143 @@
 import aiohttp
+import functools
+import time
 
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 from src.core.config import config
 from src.schemas.tg_schema import CheckBotSchema, WebHookSchema
-from src.schemas.tg_schema import SendMessageSchema, SendPhotoSchema
+from src.schemas.tg_schema import ErrorSchema, SendMessageSchema, SendPhotoSchema
+from src.schemas.tg_schema import SendAckSchema
+from typing import Annotated, TypeVar
 from src.utils.debug_logs import log_debug
+from src.utils.metrics import telegram_latency, telegram_requests
 
 URL = f"{config.tg_url}/bot{config.tg_token}"
 
+SchemaT = TypeVar("SchemaT", bound=BaseModel)
+
+# чаты, отправка в которые больше никогда не пройдёт
+DEAD_CHAT_KINDS = ("blocked", "chat_not_found")
+
+# описания 400, означающие, что Telegram больше не принимает file_id
+FILE_ID_ERRORS = (
+    "wrong file identifier",
+    "wrong remote file identifier",
+    "file reference expired",
+)
+
+
+class TelegramError(Exception):
+    """Ответ Bot API с ok=false"""
+
+    def __init__(self, response: ErrorSchema):
+        self.error_code = response.error_code
+        self.description = response.description or ""
+        self.retry_after = (
+            response.parameters.retry_after if response.parameters else None
+        )
+        super().__init__(f"{self.error_code}: {self.description}")
+
+    @property
+    def kind(self) -> str:
+        """Класс ошибки
+        Returns:
+            str: blocked - 403, бот заблокирован, удалён из группы или
+                пользователь удалён; chat_not_found - 400, чата нет;
+                rate_limited - 429; server - 5xx; bad_request - прочие 400;
+                other - всё остальное
+        """
+        if self.error_code == 403:
+            return "blocked"
+        if self.error_code == 400 and "chat not found" in self.description.lower():
+            return "chat_not_found"
+        if self.error_code == 429:
+            return "rate_limited"
+        if self.error_code is not None and self.error_code >= 500:
+            return "server"
+        if self.error_code == 400:
+            return "bad_request"
+        return "other"
+
+    @property
+    def file_id_rejected(self) -> bool:
+        """Telegram отверг file_id, а не сообщение в целом"""
+        description = self.description.lower()
+        return self.error_code == 400 and any(
+            error in description for error in FILE_ID_ERRORS
+        )
+
+
+@functools.cache
+def response_adapter(schema: type[BaseModel]) -> TypeAdapter:
+    """Адаптер ответа Bot API: ok=true проверяется по schema,
+    ok=false - по ErrorSchema. Схемы с ok: bool (CheckBotSchema,
+    WebHookSchema) сами описывают ответ с ошибкой и берутся как есть.
+    Строится один раз на каждую схему.
+    """
+    if schema.model_fields["ok"].annotation is bool:
+        return TypeAdapter(schema)
+    return TypeAdapter(Annotated[schema | ErrorSchema, Field(discriminator="ok")])
+
+
+def parse_response(body: bytes, schema: type[SchemaT]) -> SchemaT:
+    """Разобрать ответ Bot API прямо из байтов, без промежуточного dict
+    Args:
+        body (bytes): тело ответа
+        schema (type): схема ответа
+    Returns:
+        SchemaT: ответ по схеме
+    Raises:
+        TelegramError: Bot API вернул ok=false
+    """
+    response = response_adapter(schema).validate_json(body)
+    if isinstance(response, ErrorSchema):
+        raise TelegramError(response)
+    return response
+
+
+async def request_json(
+    session: aiohttp.ClientSession,
+    http_method: str,
+    method: str,
+    schema: type[SchemaT],
+    **kwargs,
+) -> SchemaT:
+    """Запрос к Bot API с учётом числа и времени запросов в метриках
+    Args:
+        session (ClientSession): http сессия
+        http_method (str): GET или POST
+        method (str): метод Bot API, например sendMessage
+        schema (type): схема успешного ответа
+        **kwargs: параметры session.request (json, data, headers)
+    Returns:
+        SchemaT: разобранный ответ
+    Raises:
+        TelegramError: Bot API вернул ok=false
+        ContentTypeError: в ответе не JSON (например, страница прокси)
+    """
+    status = "error"
+    start_time = time.perf_counter()
+    try:
+        async with session.request(http_method, f"{URL}/{method}", **kwargs) as resp:
+            status = str(resp.status)
+            body = await resp.read()
+            try:
+                return parse_response(body, schema)
+            except ValidationError as e:
+                if e.errors()[0]["type"] != "json_invalid":
+                    raise
+                # как resp.json(): повторяется наравне с ошибками сети
+                raise aiohttp.ContentTypeError(
+                    resp.request_info,
+                    resp.history,
+                    status=resp.status,
+                    message=f"Ответ не JSON: {body[:100]!r}",
+                    headers=resp.headers,
+                )
+    finally:
+        telegram_requests.inc(method, status)
+        telegram_latency.observe(time.perf_counter() - start_time, method)
+
 
 @log_debug
 async def check_bot(session: aiohttp.ClientSession) -> CheckBotSchema:
@@ -31,9 +162,7 @@ async def check_bot(session: aiohttp.ClientSession) -> CheckBotSchema:
                     }
                 }
     """
-    async with session.get(f"{URL}/getMe") as resp:
-        raw = await resp.json()
-        return CheckBotSchema(**raw)
+    return await request_json(session, "GET", "getMe", CheckBotSchema)
 
 
 @log_debug
@@ -47,15 +176,16 @@ async def send_message(
         message (str): сообщение, котрое отправляем в чат
     Returns:
         dict: возвращается словарь
+    Raises:
+        TelegramError: Bot API вернул ok=false
     """
-    url = f"{URL}/sendMessage"
     param = {
         "chat_id": chat_id,
         "text": message,
     }
-    async with session.post(url, json=param) as resp:
-        raw = await resp.json()
-    return SendMessageSchema(**raw)
+    return await request_json(
+        session, "POST", "sendMessage", SendMessageSchema, json=param
+    )
 
 
 @log_debug
@@ -67,12 +197,39 @@ async def send_image(
         chat_id (str): идентификатор чата
         image_url (str): урл адрес картинки
         caption_text (str): пост в 1024 символа и короткая подпись
+    Raises:
+        TelegramError: Bot API вернул ok=false
     """
-    url = f"{URL}/sendPhoto"
     param = {"chat_id": chat_id, "photo": image_url, "caption": caption_text}
-    async with session.post(url, data=param) as resp:
-        raw = await resp.json()
-    return SendPhotoSchema(**raw)
+    return await request_json(session, "POST", "sendPhoto", SendPhotoSchema, data=param)
+
+
+async def send_raw(
+    session: aiohttp.ClientSession, method: str, body: bytes
+) -> SendMessageSchema | SendPhotoSchema | SendAckSchema:
+    """Отправить заранее сериализованный запрос
+    Тело запроса уже закодировано в JSON, поэтому на каждый чат
+    не тратится повторная сериализация одного и того же сообщения.
+    Ответ по умолчанию проверяется только до ok и file_id картинок,
+    полная проверка включается config.tg_full_validation.
+    Args:
+        method (str): метод Bot API, sendMessage или sendPhoto
+        body (bytes): JSON тело запроса с chat_id
+    Returns:
+        SendMessageSchema | SendPhotoSchema | SendAckSchema: ответ
+    Raises:
+        TelegramError: Bot API вернул ok=false
+    """
+    if not config.tg_full_validation:
+        schema = SendAckSchema
+    elif method == "sendPhoto":
+        schema = SendPhotoSchema
+    else:
+        schema = SendMessageSchema
+    headers = {"Content-Type": "application/json"}
+    return await request_json(
+        session, "POST", method, schema, data=body, headers=headers
+    )
 
 
 @log_debug
@@ -88,7 +245,4 @@ async def set_webhook(session: aiohttp.ClientSession, https_url: str) -> WebHook
          error_code: Optional[int] = None
     """
     param = {"url": f"{https_url}/webhook"}
-    url = f"{URL}/setWebhook"
-    async with session.post(url, json=param) as resp:
-        raw = await resp.json()
-    return raw
+    return await request_json(session, "POST", "setWebhook", WebHookSchema, json=param)
@@ -0,0 +1,103 @@
+from fastapi import HTTPException
+from src.core.config import config
+from src.database.crud import create_chat_id, delete_chat, read_chat, set_delivery_time
+from src.database.session import async_session
+from src.dependencies.http_client import http_client
+from src.services.api_telegram import send_message
+from src.services.event_notifier import send_event_response
+from src.services.update_queue import UpdateDeduplicator, UpdateQueue
+from src.utils.debug_logs import log_debug
+from src.utils.delivery_time import parse_delivery_time, parse_timezone
+
+HELP_MESSAGE = (
+    "/start - добавляет чат в расписание для ежедневной отправки сообщений о событияx\n"
+    "/delete - убирает чат из расписания\n"
+    "/event - подготавливает данные о событиях и однократно отправляет в чат\n"
+    "/time ЧЧ:ММ [часовой пояс] - время ежедневной рассылки, "
+    "например /time 09:30 Asia/Yekaterinburg\n"
+    "/help - печатает это сообщение"
+)
+
+
+@log_debug
+async def handle_update(payload: dict) -> None:
+    """Обработать обновление от Telegram
+    Выполняет команду бота из сообщения. Вызывается воркерами
+    очереди обновлений, уже после ответа Telegram на вебхук.
+    Args:
+        payload (dict): тело обновления от Telegram
+    """
+    if "message" not in payload:
+        return
+    session = http_client.session
+    chat_id = payload["message"]["chat"]["id"]
+    tg_message = payload["message"].get("text")
+    if tg_message == "/start":
+        try:
+            async with async_session() as db:
+                await create_chat_id(db, chat_id)
+            await send_message(
+                session,
+                chat_id,
+                "Чат добавлен в расписание, события каждый день",
+            )
+            await send_message(session, chat_id, "Подготовка первых событий")
+            await send_event_response(session, chat_id, http_client.kudago_session)
+        except HTTPException as e:
+            if e.status_code == 409:
+                await send_message(
+                    session, chat_id, "Чат в расписание уже был добавлен"
+                )
+            else:
+                raise e
+    elif tg_message == "/delete":
+        async with async_session() as db:
+            deleted = await delete_chat(db, chat_id)
+        if deleted:
+            await send_message(session, chat_id, "Рассылка отменена")
+        else:
+            await send_message(session, chat_id, "В списке рассылок нет текущего чата")
+    elif tg_message == "/event":
+        await send_message(session, chat_id, "Собираем данные о событиях, минуту...")
+        await send_event_response(session, chat_id, http_client.kudago_session)
+    elif tg_message and tg_message.split()[0] == "/time":
+        await send_message(
+            session, chat_id, await change_delivery_time(chat_id, tg_message)
+        )
+    elif tg_message == "/help":
+        await send_message(session, chat_id, HELP_MESSAGE)
+
+
+async def change_delivery_time(chat_id: int, tg_message: str) -> str:
+    """Выполнить команду /time
+    /time - показать текущее время рассылки, /time ЧЧ:ММ [часовой пояс] -
+    изменить его. Без часового пояса остаётся прежний.
+    Args:
+        chat_id (int): идентификатор чата
+        tg_message (str): текст команды
+    Returns:
+        str: ответ для чата
+    """
+    args = tg_message.split()[1:]
+    try:
+        async with async_session() as db:
+            chat = await read_chat(db, chat_id)
+            if args:
+                delivery_time = parse_delivery_time(args[0]).strftime("%H:%M")
+                timezone = args[1] if len(args) > 1 else chat.timezone
+                if timezone is not None:
+                    parse_timezone(timezone)
+                chat = await set_delivery_time(db, chat_id, delivery_time, timezone)
+    except ValueError as e:
+        return f"{e}. Пример: /time 09:30 Europe/Moscow"
+    except HTTPException as e:
+        if e.status_code == 404:
+            return "Чат не в расписании, сначала /start"
+        raise e
+    delivery_time = chat.delivery_time or config.default_delivery_time
+    timezone = chat.timezone or config.default_timezone
+    return f"События приходят каждый день в {delivery_time} ({timezone})"
+
+
+update_queue = UpdateQueue(handle_update)
+update_dedup = UpdateDeduplicator()
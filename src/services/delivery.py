@@ -0,0 +1,261 @@
+import aiohttp
+import asyncio
+import logging
+import time
+
+from aiohttp import ClientSession
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterable, Sequence
+from src.core.config import config
+from src.database.crud import deactivate_chats
+from src.database.session import async_session
+from src.services.api_telegram import DEAD_CHAT_KINDS, TelegramError
+from src.services.event_notifier import RenderedMessage, post_rendered
+from src.services.retry import RetryBudget, RetryPolicy, call_with_retry
+from src.services.seen_items import SeenItems
+from src.utils.metrics import (
+    delivery_failures,
+    messages_per_second,
+    messages_sent,
+    pruned_chats,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Ограничитель частоты запросов по алгоритму token bucket.
+
+    Бакет пополняется со скоростью `rate` токенов в секунду и вмещает
+    не более `capacity` токенов. Ожидающие вызовы обслуживаются по очереди.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Не выдавать токены ближайшие `seconds` секунд (ответ 429)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        """Дождаться свободного токена и забрать его."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def failure_kind(error: Exception) -> str:
+    """Класс ошибки доставки для метрик: TelegramError.kind, network
+    или other. Чат в метку не попадает, чтобы число рядов не росло
+    с каждым недоступным чатом - он есть в логе и в outbox.last_error.
+    """
+    if isinstance(error, TelegramError):
+        return error.kind
+    if isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError)):
+        return "network"
+    return "other"
+
+
+@dataclass
+class DeliveryJob:
+    """Сообщения для одного чата, начиная с позиции start"""
+
+    chat_id: int
+    messages: Sequence[RenderedMessage]
+    start: int = 0
+    outbox_id: int | None = None
+    attempts: int = 0
+    # уже доставленные в чат элементы, они пропускаются
+    seen: SeenItems | None = None
+
+
+@dataclass
+class DeliveryStats:
+    """Итоги рассылки"""
+
+    chats: int = 0
+    sent: int = 0
+    failed: int = 0
+    pruned: int = 0
+    rate_limited: int = 0
+    elapsed: float = 0.0
+
+
+class DeliveryEngine:
+    """Параллельная рассылка сообщений по чатам.
+
+    Каждый чат обслуживается одним воркером, поэтому сообщения внутри
+    чата уходят строго по порядку. Число одновременных запросов ограничено
+    числом воркеров, частота отправки - глобальным (~30 msg/s) и
+    поканальным (~1 msg/s) token bucket, как требует Telegram.
+
+    Ответы 429 ставят на паузу чат, а если за секунду их получили
+    несколько разных чатов - всю рассылку, на retry_after из ответа.
+    5xx и ошибки сети повторяются с экспоненциальной задержкой в пределах
+    общего бюджета повторов.
+
+    Чаты, заблокировавшие бота или удалённые, дальше не обслуживаются
+    и пачками отключаются в базе (или удаляются при prune_mode=delete),
+    чтобы следующие рассылки их пропускали.
+    """
+
+    def __init__(
+        self,
+        session: ClientSession,
+        concurrency: int | None = None,
+        global_rate: float | None = None,
+        chat_rate: float | None = None,
+    ):
+        self.session = session
+        self.concurrency = concurrency or config.delivery_concurrency
+        self.chat_rate = chat_rate or config.tg_chat_rate
+        self.global_bucket = TokenBucket(global_rate or config.tg_global_rate)
+        self._dead_chats: dict[int, str] = {}
+        self.retry_policy = RetryPolicy()
+        self.retry_budget = RetryBudget()
+        self._rate_limited_at: deque[tuple[float, int]] = deque()
+
+    async def run_jobs(self, jobs: AsyncIterable[DeliveryJob]) -> DeliveryStats:
+        """Выполнить задания рассылки
+        Args:
+            jobs (AsyncIterable[DeliveryJob]): задания, по одному на чат
+        Returns:
+            DeliveryStats: число чатов, отправленных и неотправленных сообщений
+        """
+        stats = DeliveryStats()
+        start_time = time.perf_counter()
+        queue: asyncio.Queue[DeliveryJob | None] = asyncio.Queue(
+            maxsize=self.concurrency * 2
+        )
+        workers = [
+            asyncio.create_task(self._worker(queue, stats))
+            for _ in range(self.concurrency)
+        ]
+        try:
+            async for job in jobs:
+                await queue.put(job)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await self._flush_dead_chats(stats)
+        stats.elapsed = time.perf_counter() - start_time
+        if stats.elapsed > 0:
+            messages_per_second.set(stats.sent / stats.elapsed)
+        return stats
+
+    async def _worker(self, queue: asyncio.Queue, stats: DeliveryStats) -> None:
+        while (job := await queue.get()) is not None:
+            stats.chats += 1
+            await self._deliver_chat(job, stats)
+
+    async def _deliver_chat(self, job: DeliveryJob, stats: DeliveryStats) -> None:
+        chat_id = job.chat_id
+        chat_bucket = TokenBucket(self.chat_rate, capacity=1)
+
+        async def wait_limits() -> None:
+            await chat_bucket.acquire()
+            await self.global_bucket.acquire()
+
+        def on_rate_limited(retry_after: float) -> None:
+            stats.rate_limited += 1
+            self._pause(chat_id, chat_bucket, retry_after)
+
+        for index in range(job.start, len(job.messages)):
+            message = job.messages[index]
+            if job.seen is not None and message.fingerprint in job.seen:
+                continue
+            try:
+                await call_with_retry(
+                    lambda: post_rendered(self.session, chat_id, message),
+                    policy=self.retry_policy,
+                    budget=self.retry_budget,
+                    before_attempt=wait_limits,
+                    on_rate_limited=on_rate_limited,
+                )
+            except Exception as e:
+                stats.failed += 1
+                messages_sent.inc("failed")
+                delivery_failures.inc(failure_kind(e))
+                logger.error(f"Сообщение не отправлено. Чат: {chat_id}, {e}")
+                dead = isinstance(e, TelegramError) and e.kind in DEAD_CHAT_KINDS
+                if dead:
+                    await self._mark_dead(chat_id, e.kind, stats)
+                if await self.on_failed(job, index, e, dead) or dead:
+                    return
+                continue
+            stats.sent += 1
+            messages_sent.inc("sent")
+            if job.seen is not None:
+                job.seen.add(message.fingerprint)
+            await self.on_sent(job, index + 1)
+        await self.on_done(job)
+
+    async def on_sent(self, job: DeliveryJob, next_index: int) -> None:
+        """Сообщение доставлено, следующее по порядку - next_index"""
+
+    async def on_failed(
+        self, job: DeliveryJob, index: int, error: Exception, dead: bool
+    ) -> bool:
+        """Сообщение не доставлено после всех повторов
+        Returns:
+            bool: True - прекратить отправку в этот чат
+        """
+        return False
+
+    async def on_done(self, job: DeliveryJob) -> None:
+        """Все сообщения задания обработаны"""
+
+    def _pause(
+        self, chat_id: int, chat_bucket: TokenBucket, retry_after: float
+    ) -> None:
+        """Поставить на паузу чат, а при массовых 429 - всю рассылку"""
+        chat_bucket.pause(retry_after)
+        now = time.monotonic()
+        self._rate_limited_at.append((now, chat_id))
+        while self._rate_limited_at[0][0] < now - 1:
+            self._rate_limited_at.popleft()
+        chats = {limited_chat for _, limited_chat in self._rate_limited_at}
+        if len(chats) >= config.tg_global_429_threshold:
+            logger.warning(f"Рассылка приостановлена на {retry_after}с (429)")
+            self.global_bucket.pause(retry_after)
+
+    async def _mark_dead(self, chat_id: int, kind: str, stats: DeliveryStats) -> None:
+        self._dead_chats[chat_id] = kind
+        pruned_chats.inc(kind)
+        if len(self._dead_chats) >= config.prune_batch_size:
+            await self._flush_dead_chats(stats)
+
+    async def _flush_dead_chats(self, stats: DeliveryStats) -> None:
+        """Отключить накопленные недоступные чаты одной пачкой"""
+        if not self._dead_chats:
+            return
+        dead_chats, self._dead_chats = self._dead_chats, {}
+        try:
+            async with async_session() as db:
+                stats.pruned += await deactivate_chats(
+                    db, dead_chats, remove=config.prune_mode == "delete"
+                )
+        except Exception as e:
+            logger.error(f"Не удалось отключить чаты {list(dead_chats)}: {e}")
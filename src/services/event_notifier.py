@@ -1,59 +1,187 @@
+import functools
+import json
+import logging
+
 from aiohttp import ClientSession
+from dataclasses import dataclass, field
+from src.core.config import config
+from src.database.crud import read_seen_items, save_seen_items
+from src.database.session import async_session
+from src.schemas.digest_schema import DigestItem
 from src.services.api_kudago import collect_data
-from src.services.api_telegram import send_message, send_image
+from src.services.api_telegram import TelegramError, send_message, send_raw
+from src.services.retry import call_with_retry
+from src.services.seen_items import SeenItems, item_fingerprint
+from src.services.telegram_files import file_ids
 from src.utils.debug_logs import log_debug
 
+logger = logging.getLogger(__name__)
 
-@log_debug
-def prepare_message(event: dict) -> str:
-    """Подготовить сообщение
-    Функция готовит текст сообщения для отправки в ТГ
+
+@dataclass(frozen=True, slots=True)
+class RenderedMessage:
+    """Готовое к отправке сообщение дайджеста
+
+    Тело запроса к Bot API сериализовано заранее без chat_id,
+    на каждый чат к нему только приклеивается идентификатор.
+    """
+
+    method: str
+    text: str
+    image: str | None
+    body_tail: bytes
+    # отпечаток идентификатора элемента для отбора только новых
+    fingerprint: int
+
+    def body(self, chat_id: int) -> bytes:
+        """JSON тело запроса для конкретного чата"""
+        return b'{"chat_id":' + str(chat_id).encode() + self.body_tail
+
+
+@dataclass(frozen=True, slots=True)
+class RenderedDigest:
+    """Дайджест, отрендеренный один раз для всех чатов"""
+
+    messages: tuple[RenderedMessage, ...]
+    source: list[DigestItem] = field(repr=False, compare=False)
+
+
+@functools.lru_cache(maxsize=1024)
+def render_message(
+    text: str, url_image: str | None = None, key: str | None = None
+) -> RenderedMessage:
+    """Сериализовать сообщение в тело запроса sendMessage или sendPhoto
+    Результат кешируется, так что повторный рендер той же подписи
+    с file_id вместо адреса картинки стоит одного поиска в словаре.
     Args:
-        event (dict): словарь с данными image, dates, source, name etc.
+        text (str): текст сообщения или подпись к картинке
+        url_image (str): адрес картинки, file_id или пустое значение
+        key (str): постоянный идентификатор элемента для отпечатка;
+            в дайджестах, сохранённых до его появления, - текст и картинка
     Returns:
-        str: Подготовленное сообщение, гле значение кажного ключа добавляется
-        с новой строки
+        RenderedMessage: сообщение с заранее закодированным телом запроса
     """
-    message = ""
-    for key, value in event.items():
-        if "image" == key:
-            continue
-        if len(value) == 0:
-            continue
-        if "dates" == key:
-            message += f"Дата проведения: {value}\n"
-            continue
-        message += f"{value}\n"
-    return message
+    if url_image is None:
+        method, fields = "sendMessage", {"text": text}
+    else:
+        method, fields = "sendPhoto", {"photo": url_image, "caption": text}
+    # '{"text":...}' -> ',"text":...}', недостающее начало добавит body()
+    tail = json.dumps(fields, ensure_ascii=False, separators=(",", ":"))
+    return RenderedMessage(
+        method,
+        text,
+        url_image,
+        b"," + tail[1:].encode(),
+        item_fingerprint(key or f"{text}\0{url_image or ''}"),
+    )
 
 
 @log_debug
-async def post_event(
-    session: ClientSession, chat_id: str, message: str, url_image: str = None
+def render_digest(event_data: list[DigestItem]) -> RenderedDigest:
+    """Отрендерить дайджест
+    Args:
+        event_data (list[DigestItem]): элементы дайджеста из collect_data
+    Returns:
+        RenderedDigest: готовые сообщения в порядке отправки
+    """
+    messages = tuple(
+        render_message(item.text, item.image, item.key) for item in event_data
+    )
+    return RenderedDigest(messages=messages, source=event_data)
+
+
+_rendered_digest: RenderedDigest | None = None
+
+
+async def get_rendered_digest(session: ClientSession) -> RenderedDigest:
+    """Получить отрендеренный дайджест
+    collect_data возвращает один и тот же список, пока не обновится кеш,
+    поэтому рендер выполняется один раз на каждое обновление данных.
+    Args:
+        session (ClientSession): http сессия для KudaGo
+    """
+    global _rendered_digest
+    event_data = await collect_data(session)
+    if _rendered_digest is None or _rendered_digest.source is not event_data:
+        _rendered_digest = render_digest(event_data)
+    return _rendered_digest
+
+
+async def post_rendered(
+    session: ClientSession, chat_id: int, message: RenderedMessage
 ) -> None:
-    """Отправить сообщение в ТГ
-    Отправка сообщения в ТГ, с картинкой или без
+    """Отправить отрендеренное сообщение в ТГ
+    Картинка отправляется по URL только до первой успешной отправки,
+    дальше - по сохранённому file_id. Если Telegram отверг сам file_id
+    (400 wrong file identifier и т.п.), он удаляется из кеша и сообщение
+    один раз отправляется по URL, остальные 400 пробрасываются как есть.
     Args:
         session (ClientSession): http сессия
-        chat_id (str): идентификатор чата
-        message (str): текст сообщения
-        url_image (str): адрес картики в сети или пустое значение
+        chat_id (int): идентификатор чата
+        message (RenderedMessage): сообщение дайджеста
     """
-    if url_image is None:
-        await send_message(session, chat_id, message)
-    else:
-        await send_image(session, chat_id, url_image, message)
+    if message.image is None:
+        await send_raw(session, message.method, message.body(chat_id))
+        return
+
+    await file_ids.ensure_loaded()
+    file_id = file_ids.get(message.image)
+    if file_id is None:
+        async with file_ids.lock(message.image):
+            file_id = file_ids.get(message.image)
+            if file_id is None:
+                try:
+                    response = await send_raw(
+                        session, message.method, message.body(chat_id)
+                    )
+                except Exception:
+                    file_ids.release(message.image)
+                    raise
+                await file_ids.remember(message.image, response)
+                return
+    by_file_id = render_message(message.text, file_id)
+    try:
+        await send_raw(session, by_file_id.method, by_file_id.body(chat_id))
+    except TelegramError as e:
+        if not e.file_id_rejected:
+            raise
+        logger.warning(f"file_id для {message.image} отклонён: {e}")
+        await file_ids.forget(message.image, file_id)
+        response = await send_raw(session, message.method, message.body(chat_id))
+        await file_ids.remember(message.image, response)
 
 
 @log_debug
-async def send_event_response(session: ClientSession, chat_id: str) -> None:
+async def send_event_response(
+    session: ClientSession, chat_id: int, kudago_session: ClientSession | None = None
+) -> None:
     """Подготовить и отправить сообщение
-    Выполняется сбор данных, затем обработка, затем отправка сообщения в ТГ
+    Выполняется сбор данных и рендер (оба кешируются), затем отправка в ТГ
+    с повторами при 429, 5xx и ошибках сети. При deliver_only_new
+    отправляются только элементы, которых в чате ещё не было.
     Args:
-        session (ClientSession): http сессия
-        chat_id (str): идентификатор чата
+        session (ClientSession): http сессия для Telegram
+        chat_id (int): идентификатор чата
+        kudago_session (ClientSession | None): сессия для KudaGo,
+            по умолчанию session
     """
-    event_data = await collect_data(session)
-    for event in event_data:
-        message = prepare_message(event)
-        await post_event(session, chat_id, message, event.get("image"))
+    digest = await get_rendered_digest(kudago_session or session)
+    if not config.deliver_only_new:
+        for message in digest.messages:
+            await call_with_retry(lambda: post_rendered(session, chat_id, message))
+        return
+
+    async with async_session() as db:
+        packed = (await read_seen_items(db, [chat_id])).get(chat_id)
+    seen = SeenItems.unpack(packed)
+    new_messages = [m for m in digest.messages if m.fingerprint not in seen]
+    if not new_messages:
+        await send_message(session, chat_id, "Новых событий пока нет")
+        return
+    try:
+        for message in new_messages:
+            await call_with_retry(lambda: post_rendered(session, chat_id, message))
+            seen.add(message.fingerprint)
+    finally:
+        async with async_session() as db:
+            await save_seen_items(db, chat_id, seen.pack())
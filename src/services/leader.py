@@ -0,0 +1,49 @@
+import logging
+
+from src.core.config import config
+from src.database.crud import acquire_lock, release_lock
+from src.database.session import async_session
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    """Выбор ведущего экземпляра через блокировку в базе.
+
+    Ведущим считается экземпляр, который держит строку блокировки
+    и продлевает её раньше, чем истечёт ttl. Если он упал, через ttl
+    блокировку забирает любой другой.
+    """
+
+    def __init__(self, name: str, owner: str | None = None, ttl: int | None = None):
+        self.name = name
+        self.owner = owner or config.instance_id
+        self.ttl = ttl or config.leader_lock_ttl
+        self.is_leader = False
+
+    async def acquire(self) -> bool:
+        """Взять или продлить блокировку
+        Returns:
+            bool: True, если этот экземпляр ведущий
+        """
+        try:
+            async with async_session() as db:
+                is_leader = await acquire_lock(db, self.name, self.owner, self.ttl)
+        except Exception as e:
+            logger.error(f"Не удалось взять блокировку {self.name}: {e}")
+            is_leader = False
+        if is_leader != self.is_leader:
+            logger.info(f"{self.owner} ведущий для {self.name}: {is_leader}")
+        self.is_leader = is_leader
+        return is_leader
+
+    async def release(self) -> None:
+        """Отпустить блокировку при остановке экземпляра"""
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        try:
+            async with async_session() as db:
+                await release_lock(db, self.name, self.owner)
+        except Exception as e:
+            logger.error(f"Не удалось отпустить блокировку {self.name}: {e}")
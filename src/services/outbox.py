@@ -0,0 +1,206 @@
+import asyncio
+import logging
+
+from aiohttp import ClientSession
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Sequence
+from src.core.config import config
+from src.database.crud import (
+    claim_outbox,
+    delete_old_outbox,
+    enqueue_due_outbox,
+    read_digest,
+    read_seen_items,
+    save_digest,
+    save_seen_items,
+    update_outbox,
+)
+from src.database.session import async_session
+from src.models.base import utcnow
+from src.services.delivery import DeliveryEngine, DeliveryJob, DeliveryStats
+from src.services.event_notifier import RenderedDigest, RenderedMessage, render_message
+from src.services.retry import retry_reason
+from src.services.seen_items import SeenItems
+from src.utils.debug_logs import log_debug
+
+logger = logging.getLogger(__name__)
+
+_drain_lock = asyncio.Lock()
+
+
+class OutboxDeliveryEngine(DeliveryEngine):
+    """Рассылка по записям outbox.
+
+    Элементы, которые уже были в чате, пропускаются, а отпечатки
+    отправленных сохраняются в chatseen по окончании доставки в чат,
+    в том числе прерванной ошибкой.
+    После каждого отправленного сообщения в базе фиксируется номер
+    следующего, поэтому после падения процесса доставка продолжается
+    с места остановки и уже отправленные сообщения не повторяются.
+    Сообщение, отклонённое Telegram (400 и прочие ошибки, которые
+    не лечатся повтором), пропускается: ошибка пишется в last_error,
+    доставка идёт дальше. Сбой сервера, сети или 429, не прошедший
+    после всех повторов, откладывает доставку в этот чат
+    с экспоненциальной задержкой, а после outbox_max_attempts
+    попыток она помечается как failed.
+    """
+
+    def __init__(
+        self,
+        session: ClientSession,
+        owner: str | None = None,
+        shard: int | None = None,
+        shards: int | None = None,
+        **kwargs,
+    ):
+        super().__init__(session, **kwargs)
+        self.owner = owner or config.instance_id
+        self.shard = config.worker_shard if shard is None else shard
+        self.shards = shards or config.worker_shards
+        self._digests: dict[str, tuple[RenderedMessage, ...]] = {}
+
+    async def pending_jobs(self) -> AsyncIterator[DeliveryJob]:
+        """Задания по доставкам, взятым в аренду у outbox
+        Пачки берутся по мере того, как воркеры освобождаются, так что
+        несколько процессов или хостов делят одну рассылку между собой.
+        """
+        async with async_session() as db:
+            while True:
+                chunk = await claim_outbox(
+                    db, self.owner, shard=self.shard, shards=self.shards
+                )
+                if not chunk:
+                    return
+                seen = {}
+                if config.deliver_only_new:
+                    seen = await read_seen_items(db, [row.chat_id for row in chunk])
+                for row in chunk:
+                    messages = await self._messages(db, row.digest_id)
+                    yield DeliveryJob(
+                        row.chat_id,
+                        messages,
+                        start=row.next_item,
+                        outbox_id=row.id,
+                        attempts=row.attempts,
+                        seen=(
+                            SeenItems.unpack(seen.get(row.chat_id))
+                            if config.deliver_only_new
+                            else None
+                        ),
+                    )
+
+    async def _messages(self, db, digest_id: str) -> Sequence[RenderedMessage]:
+        messages = self._digests.get(digest_id)
+        if messages is None:
+            digest = await read_digest(db, digest_id)
+            messages = tuple(
+                render_message(item["text"], item.get("image"), item.get("key"))
+                for item in (digest.messages if digest is not None else [])
+            )
+            self._digests[digest_id] = messages
+        return messages
+
+    async def _update(self, job: DeliveryJob, **values) -> None:
+        try:
+            async with async_session() as db:
+                await update_outbox(db, job.outbox_id, **values)
+        except Exception as e:
+            logger.error(f"Не удалось обновить outbox {job.outbox_id}: {e}")
+
+    async def on_sent(self, job: DeliveryJob, next_index: int) -> None:
+        # каждое отправленное сообщение продлевает аренду
+        lease_until = utcnow() + timedelta(seconds=config.outbox_lease_seconds)
+        await self._update(job, next_item=next_index, lease_until=lease_until)
+
+    async def _save_seen(self, job: DeliveryJob) -> None:
+        if job.seen is None:
+            return
+        try:
+            async with async_session() as db:
+                await save_seen_items(db, job.chat_id, job.seen.pack())
+        except Exception as e:
+            logger.error(f"Не удалось сохранить доставленные {job.chat_id}: {e}")
+
+    async def on_failed(
+        self, job: DeliveryJob, index: int, error: Exception, dead: bool
+    ) -> bool:
+        if not dead and retry_reason(error) is None:
+            # повтор не поможет: пропустить сообщение и отправлять следующие
+            await self._update(job, next_item=index + 1, last_error=str(error)[:512])
+            return False
+        # уже отправленные до ошибки не должны уйти со следующим дайджестом
+        await self._save_seen(job)
+        if dead:
+            await self._update(
+                job, status="dead", last_error=str(error)[:512], lease_until=None
+            )
+            return True
+        attempts = job.attempts + 1
+        values = {
+            "attempts": attempts,
+            "last_error": str(error)[:512],
+            "lease_owner": None,
+            "lease_until": None,
+        }
+        if attempts >= config.outbox_max_attempts:
+            values["status"] = "failed"
+        else:
+            delay = min(
+                config.outbox_retry_max_delay,
+                config.outbox_retry_delay * 2 ** (attempts - 1),
+            )
+            values["next_attempt_at"] = utcnow() + timedelta(seconds=delay)
+        await self._update(job, **values)
+        return True
+
+    async def on_done(self, job: DeliveryJob) -> None:
+        await self._save_seen(job)
+        await self._update(job, status="sent", lease_until=None)
+
+
+@log_debug
+async def enqueue_digest(digest: RenderedDigest, now: datetime) -> int:
+    """Сохранить дайджест и поставить его в outbox для чатов,
+    у которых наступило время доставки
+    Args:
+        digest (RenderedDigest): отрендеренный дайджест
+        now (datetime): текущее время в UTC
+    Returns:
+        int: число новых доставок
+    """
+    messages = [
+        {
+            "kind": item.kind,
+            "key": item.key,
+            "text": message.text,
+            "image": message.image,
+        }
+        for item, message in zip(digest.source, digest.messages)
+    ]
+    async with async_session() as db:
+        digest_id = await save_digest(db, messages)
+        return await enqueue_due_outbox(db, digest_id, now)
+
+
+@log_debug
+async def cleanup_outbox() -> None:
+    """Удалить доставки и дайджесты старше config.outbox_retention_days"""
+    async with async_session() as db:
+        deleted = await delete_old_outbox(db, config.outbox_retention_days)
+    logger.info(f"Удалено старых доставок: {deleted}")
+
+
+@log_debug
+async def drain_outbox(session: ClientSession) -> DeliveryStats:
+    """Выполнить все доставки из outbox, которые пора отправить
+    Одновременно в процессе работает только один обход, следующий
+    дожидается его окончания. Другие процессы и хосты могут обходить
+    outbox параллельно: доставки разбираются через аренду.
+    Args:
+        session (ClientSession): http сессия
+    Returns:
+        DeliveryStats: итоги рассылки
+    """
+    async with _drain_lock:
+        engine = OutboxDeliveryEngine(session)
+        return await engine.run_jobs(engine.pending_jobs())
@@ -0,0 +1,120 @@
+import asyncio
+import aiohttp
+import logging
+import random
+
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, TypeVar
+from src.core.config import config
+from src.services.api_telegram import TelegramError
+from src.utils.metrics import delivery_retries
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class RetryPolicy:
+    """Параметры повторов: число попыток и экспоненциальная задержка"""
+
+    max_attempts: int = field(default_factory=lambda: config.tg_retry_attempts)
+    base_delay: float = field(default_factory=lambda: config.tg_retry_base_delay)
+    max_delay: float = field(default_factory=lambda: config.tg_retry_max_delay)
+
+    def backoff(self, attempt: int) -> float:
+        """Задержка перед повтором с полным джиттером: U(0, base * 2^attempt)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class RetryBudget:
+    """Бюджет повторов на ошибки сервера и сети.
+
+    Повторов может быть не больше `min_retries` плюс доля `ratio`
+    от успешных запросов. Когда Telegram лежит, бюджет быстро кончается
+    и рассылка не усиливает нагрузку лавиной повторов.
+    """
+
+    def __init__(self, ratio: float | None = None, min_retries: int | None = None):
+        self.ratio = config.tg_retry_budget_ratio if ratio is None else ratio
+        self.min_retries = (
+            config.tg_retry_budget_min if min_retries is None else min_retries
+        )
+        self.successes = 0
+        self.retries = 0
+
+    def record_success(self) -> None:
+        self.successes += 1
+
+    def try_spend(self) -> bool:
+        """Забрать один повтор из бюджета, если он ещё есть"""
+        if self.retries >= self.min_retries + self.ratio * self.successes:
+            return False
+        self.retries += 1
+        return True
+
+
+def retry_reason(error: Exception) -> str | None:
+    """Причина, по которой запрос стоит повторить, или None"""
+    if isinstance(error, TelegramError):
+        if error.kind in ("rate_limited", "server"):
+            return error.kind
+        return None
+    if isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError)):
+        return "network"
+    return None
+
+
+async def call_with_retry(
+    call: Callable[[], Awaitable[T]],
+    policy: RetryPolicy | None = None,
+    budget: RetryBudget | None = None,
+    before_attempt: Callable[[], Awaitable[None]] | None = None,
+    on_rate_limited: Callable[[float], None] | None = None,
+) -> T:
+    """Выполнить запрос к Bot API с повторами
+    429 повторяется после retry_after из ответа. Если передан
+    on_rate_limited, он сам ставит паузу (например, в token bucket,
+    которого дождётся before_attempt), иначе выполняется sleep.
+    5xx, ошибки сети и таймауты повторяются с экспоненциальной задержкой
+    с джиттером, пока хватает попыток и бюджета.
+    Args:
+        call (Callable): фабрика корутины запроса
+        policy (RetryPolicy): число попыток и задержки
+        budget (RetryBudget): общий бюджет повторов на ошибки сервера и сети
+        before_attempt (Callable): ожидание перед каждой попыткой (лимиты)
+        on_rate_limited (Callable): реакция на 429, получает retry_after
+    Returns:
+        T: результат успешного запроса
+    """
+    policy = policy or RetryPolicy()
+    attempt = 0
+    while True:
+        if before_attempt is not None:
+            await before_attempt()
+        try:
+            result = await call()
+        except Exception as e:
+            attempt += 1
+            reason = retry_reason(e)
+            if reason is None or attempt >= policy.max_attempts:
+                raise
+            if reason == "rate_limited":
+                retry_after = float(e.retry_after or 1)
+                if on_rate_limited is not None:
+                    on_rate_limited(retry_after)
+                    delay = 0.0
+                else:
+                    delay = retry_after
+            else:
+                if budget is not None and not budget.try_spend():
+                    logger.warning(f"Бюджет повторов исчерпан: {e}")
+                    raise
+                delay = policy.backoff(attempt)
+            delivery_retries.inc(reason)
+            logger.warning(f"Повтор {attempt} через {delay:.1f}с: {e}")
+            await asyncio.sleep(delay)
+        else:
+            if budget is not None:
+                budget.record_success()
+            return result
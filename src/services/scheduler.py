@@ -1,38 +1,115 @@
-from aiohttp import ClientSession
+import time
+
+from datetime import datetime
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from src.core.config import config
-from src.database.crud import get_chat_list
+from src.database.crud import has_due_chats
 from src.database.session import async_session
-from src.services.event_notifier import prepare_message, post_event
-from src.services.api_kudago import collect_data
+from src.dependencies.http_client import http_client
+from src.models.base import utcnow
+from src.services.delivery import DeliveryStats
+from src.services.event_notifier import get_rendered_digest
+from src.services.leader import LeaderLock
+from src.services.outbox import cleanup_outbox, drain_outbox, enqueue_digest
 from src.utils.debug_logs import log_debug
+from src.utils.metrics import scheduler_run_duration
+
+leader = LeaderLock("notification")
+
+
+@log_debug
+async def leader_notification():
+    """Рассылка на ведущем экземпляре
+    Задача по расписанию есть у каждого экземпляра, но дайджест собирает
+    и ставит в outbox только тот, кто держит блокировку в базе.
+    Отправку затем делят все экземпляры.
+    """
+    if not await leader.acquire():
+        return
+    await background_notification()
+
+
+@log_debug
+async def leader_cleanup():
+    """Очистка outbox на ведущем экземпляре"""
+    if await leader.acquire():
+        await cleanup_outbox()
 
 
 @log_debug
 async def background_notification():
     """Фоновая рассылка
-    Функция используется планировщиком, чтобы в фоновом режиме
-    осуществлять рассылку с событиями на текущий день.
+    Функция используется планировщиком каждую минуту, чтобы
+    в фоновом режиме разослать события на текущий день чатам,
+    у которых наступило выбранное время доставки.
+    Сообщения рассылаются параллельно через outbox
+    с соблюдением лимитов Telegram. Соединения берутся из общих
+    пулов http_client, открытых приложением или воркером.
     """
-    async with ClientSession(timeout=config.get_timeout()) as session:
-        async with async_session() as db:
-            chats = await get_chat_list(db)
+    start_time = time.perf_counter()
+    try:
+        await run_notification()
+    finally:
+        scheduler_run_duration.observe(time.perf_counter() - start_time)
+
 
-        if not chats:
-            print("Нет чатов")
+async def run_notification():
+    """Собрать дайджест, поставить его в outbox и разослать
+    Чаты выбираются по индексу next_delivery_at, так что нагрузка
+    распределяется по дню по выбранному чатами времени. Если никому
+    не пора, дайджест не собирается. Доставки записываются в базу
+    до начала отправки, так что после падения процесса рассылка
+    продолжается с места остановки.
+    """
+    now = utcnow()
+    async with async_session() as db:
+        if not await has_due_chats(db, now):
             return
+    digest = await get_rendered_digest(http_client.kudago_session)
+    await enqueue_digest(digest, now)
+    stats = await drain_outbox(http_client.session)
+    print_stats(stats)
+
+
+@log_debug
+async def background_drain():
+    """Выполнить отложенные доставки
+    Повторяет доставки, отложенные после ошибок, и продолжает рассылку,
+    прерванную падением процесса.
+    """
+    stats = await drain_outbox(http_client.session)
+    if stats.chats:
+        print_stats(stats)
 
-        events_list = await collect_data(session)
-
-        for event in events_list:
-            message = prepare_message(event)
-            img_url = event.get("image")
-            for chat in chats:
-                chat_id = chat.chat_id
-                try:
-                    await post_event(session, chat_id, message, img_url)
-                except Exception as e:
-                    print(f"Сообщение не отправлено. Чат: {chat_id}, {e}")
+
+def print_stats(stats: DeliveryStats) -> None:
+    print(
+        f"Рассылка завершена. Чатов: {stats.chats}, отправлено: {stats.sent}, "
+        f"ошибок: {stats.failed}, отключено чатов: {stats.pruned}, "
+        f"за {stats.elapsed:.1f}с"
+    )
+
+
+def add_delivery_jobs(scheduler: AsyncIOScheduler) -> None:
+    """Добавить задачи рассылки: ежеминутный запуск, продление
+    блокировки ведущего, обход outbox (сразу после старта - чтобы
+    продолжить рассылку, прерванную падением процесса) и очистку
+    """
+    now = datetime.now()
+    scheduler.add_job(leader_notification, "cron", minute="*")
+    scheduler.add_job(leader_cleanup, "cron", hour=4, minute=0)
+    scheduler.add_job(
+        leader.acquire,
+        "interval",
+        seconds=max(1, config.leader_lock_ttl // 3),
+        next_run_time=now,
+    )
+    scheduler.add_job(
+        background_drain,
+        "interval",
+        seconds=config.outbox_drain_interval,
+        next_run_time=now,
+    )
 
 
 scheduler = AsyncIOScheduler()
@@ -0,0 +1,58 @@
+import hashlib
+
+from array import array
+from typing import Iterable
+from src.core.config import config
+
+
+def item_fingerprint(key: str) -> int:
+    """64-битный отпечаток постоянного идентификатора элемента дайджеста"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class SeenItems:
+    """Ограниченный набор отпечатков, уже доставленных в чат.
+
+    Хранится в базе упакованным массивом 64-битных чисел (8 байт на элемент),
+    в памяти - ещё и множеством для проверки за O(1). При упаковке
+    лишние самые старые отпечатки вытесняются.
+    """
+
+    __slots__ = ("limit", "_order", "_set")
+
+    def __init__(self, fingerprints: Iterable[int] = (), limit: int | None = None):
+        self.limit = limit or config.seen_items_limit
+        self._order = array("Q", fingerprints)
+        self._set = set(self._order)
+        self._trim()
+
+    @classmethod
+    def unpack(cls, packed: bytes | None, limit: int | None = None) -> "SeenItems":
+        """Восстановить набор из значения столбца chatseen.items"""
+        order = array("Q")
+        if packed:
+            order.frombytes(packed)
+        return cls(order, limit)
+
+    def pack(self) -> bytes:
+        """Упаковать набор для записи в базу"""
+        self._trim()
+        return self._order.tobytes()
+
+    def __contains__(self, fingerprint: int) -> bool:
+        return fingerprint in self._set
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def add(self, fingerprint: int) -> None:
+        if fingerprint in self._set:
+            return
+        self._order.append(fingerprint)
+        self._set.add(fingerprint)
+
+    def _trim(self) -> None:
+        overflow = len(self._order) - self.limit
+        if overflow > 0:
+            self._set.difference_update(self._order[:overflow])
+            del self._order[:overflow]
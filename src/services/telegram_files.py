@@ -0,0 +1,90 @@
+import asyncio
+import logging
+
+from src.database.crud import delete_file_id, read_file_ids, save_file_id
+from src.database.session import async_session
+from src.schemas.tg_schema import SendAckSchema, SendPhotoSchema
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+
+class FileIdCache:
+    """Соответствие адреса картинки и её file_id в Telegram.
+
+    После первой успешной отправки картинки по URL Telegram возвращает
+    file_id, по которому её можно отправлять повторно без скачивания и
+    обработки. Соответствия хранятся в памяти и в таблице telegramfile.
+    """
+
+    def __init__(self):
+        self._file_ids: dict[str, str] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+
+    async def ensure_loaded(self) -> None:
+        """Однократно загрузить сохранённые file_id из базы"""
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            try:
+                async with async_session() as db:
+                    self._file_ids.update(await read_file_ids(db))
+            except SQLAlchemyError as e:
+                logger.error(f"Не удалось загрузить file_id из базы: {e}")
+            self._loaded = True
+
+    def get(self, image_url: str) -> str | None:
+        return self._file_ids.get(image_url)
+
+    def lock(self, image_url: str) -> asyncio.Lock:
+        """Блокировка первой отправки картинки по URL
+
+        Пока первый чат получает картинку по URL, остальные ждут её file_id,
+        а не заставляют Telegram скачивать ту же картинку параллельно.
+        """
+        lock = self._locks.get(image_url)
+        if lock is None:
+            lock = self._locks[image_url] = asyncio.Lock()
+        return lock
+
+    def release(self, image_url: str) -> None:
+        """Убрать блокировку картинки после неудачной отправки по URL
+        Следующие чаты не выстраиваются в очередь за картинкой,
+        которую Telegram не принял, а запись о ней не копится.
+        """
+        self._locks.pop(image_url, None)
+
+    async def remember(
+        self, image_url: str, response: SendPhotoSchema | SendAckSchema
+    ) -> None:
+        """Запомнить file_id самого большого размера из ответа sendPhoto"""
+        if not response.result.photo:
+            return
+        largest = max(response.result.photo, key=lambda size: size.width * size.height)
+        self._file_ids[image_url] = largest.file_id
+        self._locks.pop(image_url, None)
+        try:
+            async with async_session() as db:
+                await save_file_id(db, image_url, largest.file_id)
+        except SQLAlchemyError as e:
+            logger.error(f"Не удалось сохранить file_id {image_url}: {e}")
+
+    async def forget(self, image_url: str, file_id: str) -> None:
+        """Забыть file_id, который Telegram больше не принимает
+        Запись удаляется, только если за это время её не заменили
+        новым file_id из другой отправки.
+        """
+        if self._file_ids.get(image_url) == file_id:
+            del self._file_ids[image_url]
+        try:
+            async with async_session() as db:
+                await delete_file_id(db, image_url, file_id)
+        except SQLAlchemyError as e:
+            logger.error(f"Не удалось удалить file_id {image_url}: {e}")
+
+
+file_ids = FileIdCache()
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import time
+
+from collections import deque
+from pathlib import Path
+from typing import Awaitable, Callable
+from src.core.config import config
+from src.utils.metrics import webhook_processing, webhook_queue_depth
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateQueue:
+    """Очередь обновлений Telegram с пулом воркеров.
+
+    Вебхук только кладёт обновление в очередь и сразу отвечает 200,
+    обработка идёт в фоне. Размер очереди ограничен: если она заполнена,
+    submit возвращает False и вебхук отвечает ошибкой, чтобы Telegram
+    повторил доставку позже.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[dict], Awaitable[None]],
+        workers: int | None = None,
+        maxsize: int | None = None,
+    ):
+        self.handler = handler
+        self.workers = workers or config.webhook_workers
+        self.maxsize = maxsize or config.webhook_queue_size
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.wait_time_total = 0.0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def start(self) -> None:
+        """Запустить воркеры"""
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        webhook_queue_depth.set_function(self._queue.qsize)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, drain_timeout: float | None = None) -> None:
+        """Дождаться обработки очереди (не дольше drain_timeout) и остановить воркеры"""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(
+                self._queue.join(), drain_timeout or config.webhook_drain_timeout
+            )
+        except TimeoutError:
+            logger.warning(f"Не обработано обновлений: {self._queue.qsize()}")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, payload: dict) -> bool:
+        """Поставить обновление в очередь
+        Returns:
+            bool: False, если очередь заполнена или не запущена
+        """
+        try:
+            self._queue.put_nowait((time.perf_counter(), payload))
+        except (asyncio.QueueFull, AttributeError):
+            self.rejected += 1
+            return False
+        self.accepted += 1
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            enqueued_at, payload = await self._queue.get()
+            started_at = time.perf_counter()
+            try:
+                await self.handler(payload)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Ошибка обработки обновления: {e}", exc_info=True)
+            finally:
+                latency = time.perf_counter() - enqueued_at
+                self.wait_time_total += started_at - enqueued_at
+                self.latency_total += latency
+                self.latency_max = max(self.latency_max, latency)
+                webhook_processing.observe(latency)
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        """Глубина очереди, счётчики и задержки обработки (в секундах)"""
+        done = self.processed + self.failed
+        return {
+            "depth": self._queue.qsize() if self._queue is not None else 0,
+            "maxsize": self.maxsize,
+            "workers": self.workers,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "avg_wait": self.wait_time_total / done if done else 0.0,
+            "avg_latency": self.latency_total / done if done else 0.0,
+            "max_latency": self.latency_max,
+        }
+
+
+class UpdateDeduplicator:
+    """Окно недавно принятых update_id.
+
+    Telegram повторяет доставку, если вебхук отвечает медленно. Повторы
+    отбрасываются до любой работы с базой и HTTP. Окно ограничено
+    `window` последними id. Если задан `state_path`, максимальный
+    принятый id сохраняется в файл вместе со временем записи, и после
+    рестарта всё, что не новее него, тоже считается повтором.
+
+    Отметка старше `update_state_max_age` (Telegram хранит
+    неподтверждённые обновления сутки) не применяется: после недели
+    без обновлений Telegram выбирает следующий update_id случайно,
+    и он может оказаться меньше сохранённого.
+    """
+
+    def __init__(self, window: int | None = None, state_path: str | None = None):
+        self.window = window or config.update_dedup_window
+        self.state_path = state_path or config.update_state_path
+        self.high_water_mark = 0
+        self.duplicates = 0
+        self._persisted_mark = 0
+        self._persisted_at = 0.0
+        self._seen: set[int] = set()
+        self._order: deque[int] = deque()
+        self._unsaved = 0
+
+    def is_duplicate(self, update_id: int | None) -> bool:
+        """Проверить, принималось ли уже обновление с таким id"""
+        if update_id is None:
+            return False
+        if update_id in self._seen or (
+            update_id <= self._persisted_mark and self._mark_is_fresh()
+        ):
+            self.duplicates += 1
+            return True
+        return False
+
+    def _mark_is_fresh(self) -> bool:
+        if time.time() - self._persisted_at <= config.update_state_max_age:
+            return True
+        # после долгого простоя id могли начаться заново
+        self._persisted_mark = 0
+        return False
+
+    def remember(self, update_id: int | None) -> None:
+        """Запомнить id принятого обновления"""
+        if update_id is None:
+            return
+        self._seen.add(update_id)
+        self._order.append(update_id)
+        if len(self._order) > self.window:
+            self._seen.discard(self._order.popleft())
+        self.high_water_mark = max(self.high_water_mark, update_id)
+        self._unsaved += 1
+        if self._unsaved >= config.update_state_save_every:
+            self.save()
+
+    def load(self) -> None:
+        """Прочитать сохранённый максимальный update_id"""
+        if not self.state_path:
+            return
+        path = Path(self.state_path)
+        try:
+            fields = path.read_text().split()
+            mark = int(fields[0])
+            # старый формат без времени - берётся время изменения файла
+            saved_at = float(fields[1]) if len(fields) > 1 else path.stat().st_mtime
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, IndexError) as e:
+            logger.error(f"Не удалось прочитать {self.state_path}: {e}")
+            return
+        if time.time() - saved_at > config.update_state_max_age:
+            logger.info(f"Отметка update_id {mark} устарела и не применяется")
+            return
+        self._persisted_mark = mark
+        self._persisted_at = saved_at
+        self.high_water_mark = max(self.high_water_mark, mark)
+
+    def save(self) -> None:
+        """Сохранить максимальный принятый update_id"""
+        self._unsaved = 0
+        if not self.state_path or not self.high_water_mark:
+            return
+        try:
+            path = Path(self.state_path)
+            tmp_path = path.with_suffix(path.suffix + ".tmp")
+            tmp_path.write_text(f"{self.high_water_mark} {time.time():.0f}")
+            tmp_path.replace(path)
+        except OSError as e:
+            logger.error(f"Не удалось сохранить {self.state_path}: {e}")
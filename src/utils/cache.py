@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import time
+
+from typing import Any, Awaitable, Callable, Hashable
+from src.utils.metrics import cache_stats
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Внутрипроцессный кеш с временем жизни записей.
+
+    Одновременные промахи по одному ключу объединяются в одну загрузку
+    (single-flight). Если задан `refresh_ahead` (доля от ttl), запись
+    обновляется в фоне после этой доли срока жизни, а вызывающие пока
+    получают текущее значение.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        refresh_ahead: float | None = None,
+        maxsize: int | None = None,
+        name: str | None = None,
+    ):
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self._data: dict[Hashable, tuple[Any, float, float]] = {}
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        if name is not None:
+            for stat in ("size", "hits", "misses", "coalesced", "refreshes"):
+                cache_stats.set_function(
+                    lambda stat=stat: self.stats()[stat], name, stat
+                )
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Вернуть значение, если оно ещё не устарело"""
+        entry = self._data.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            self.misses += 1
+            return default
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Сохранить значение с отсчётом ttl от текущего момента"""
+        now = time.monotonic()
+        refresh_at = now + self.ttl * self.refresh_ahead if self.refresh_ahead else None
+        self._data.pop(key, None)
+        self._data[key] = (value, now + self.ttl, refresh_at)
+        if self.maxsize is not None and len(self._data) > self.maxsize:
+            # словарь хранит порядок вставки - вытесняем самую старую запись
+            self._data.pop(next(iter(self._data)))
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """Сбросить одну запись или весь кеш"""
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    async def get_or_load(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Получить значение из кеша или загрузить его
+        Args:
+            key (Hashable): ключ записи
+            loader (Callable): корутина-фабрика, загружающая значение
+        Returns:
+            Any: закешированное или только что загруженное значение
+        """
+        entry = self._data.get(key, _MISSING)
+        now = time.monotonic()
+        if entry is not _MISSING and entry[1] > now:
+            self.hits += 1
+            if entry[2] is not None and entry[2] <= now and key not in self._inflight:
+                self.refreshes += 1
+                task = self._start_load(key, loader)
+                task.add_done_callback(self._log_refresh_error)
+            return entry[0]
+
+        self.misses += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._start_load(key, loader)
+        else:
+            self.coalesced += 1
+        # shield: отмена одного ожидающего не должна отменять общую загрузку
+        return await asyncio.shield(task)
+
+    def _start_load(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> asyncio.Task:
+        async def load() -> Any:
+            try:
+                value = await loader()
+                self.set(key, value)
+                return value
+            finally:
+                self._inflight.pop(key, None)
+
+        task = asyncio.ensure_future(load())
+        self._inflight[key] = task
+        return task
+
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Ошибка фонового обновления кеша: {task.exception()}")
+
+    def stats(self) -> dict[str, int]:
+        """Счётчики попаданий и промахов"""
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+        }
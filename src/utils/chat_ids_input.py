@@ -0,0 +1,92 @@
+import json
+
+from fastapi import HTTPException, Request
+from typing import AsyncIterator
+from src.core.config import config
+from src.schemas.endpoint_schema import BulkChatResult
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+def parse_chat_id(value) -> int:
+    """Идентификатор чата из числа или объекта {"chat_id": ...}"""
+    if isinstance(value, dict):
+        value = value.get("chat_id")
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise HTTPException(
+            status_code=422, detail=f"Некорректный идентификатор чата: {value!r}"
+        )
+    return value
+
+
+def parse_ndjson_line(line: bytes, number: int) -> int | BulkChatResult:
+    """Идентификатор чата из строки NDJSON или результат invalid"""
+    try:
+        return parse_chat_id(json.loads(line))
+    except ValueError:
+        detail = "Некорректная строка NDJSON"
+    except HTTPException as e:
+        detail = e.detail
+    return BulkChatResult(
+        result="invalid", line=number, detail=f"{detail}: {line[:100]!r}"
+    )
+
+
+async def read_chat_id_batches(
+    request: Request, batch_size: int | None = None
+) -> AsyncIterator[tuple[list[int], list[BulkChatResult]]]:
+    """Прочитать идентификаторы чатов из тела запроса пачками
+    Тело - JSON массив ([1, 2, {"chat_id": 3}]) или NDJSON поток,
+    по одному числу или объекту на строку. NDJSON читается по мере
+    поступления, поэтому большие списки не держатся в памяти целиком.
+    JSON массив проверяется целиком до записи, ошибка - 400/422.
+    В NDJSON предыдущие пачки к моменту ошибки уже записаны, поэтому
+    некорректная строка не прерывает запрос, а попадает в результаты
+    как invalid с номером строки.
+    Args:
+        request (Request): запрос FastAPI
+        batch_size (int): размер пачки, по умолчанию config.bulk_batch_size
+    Yields:
+        tuple[list[int], list[BulkChatResult]]: очередная пачка
+            идентификаторов и некорректные строки, встреченные в ней
+    """
+    batch_size = batch_size or config.bulk_batch_size
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in NDJSON_TYPES:
+        try:
+            data = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Ожидается JSON массив")
+        if not isinstance(data, list):
+            raise HTTPException(status_code=400, detail="Ожидается JSON массив")
+        chat_ids = [parse_chat_id(value) for value in data]
+        for i in range(0, len(chat_ids), batch_size):
+            yield chat_ids[i : i + batch_size], []
+        return
+
+    batch, invalid = [], []
+    number = 0
+    tail = b""
+    async for chunk in request.stream():
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        for line in lines:
+            number += 1
+            if not line.strip():
+                continue
+            parsed = parse_ndjson_line(line, number)
+            if isinstance(parsed, BulkChatResult):
+                invalid.append(parsed)
+                continue
+            batch.append(parsed)
+            if len(batch) >= batch_size:
+                yield batch, invalid
+                batch, invalid = [], []
+    if tail.strip():
+        parsed = parse_ndjson_line(tail, number + 1)
+        if isinstance(parsed, BulkChatResult):
+            invalid.append(parsed)
+        else:
+            batch.append(parsed)
+    if batch or invalid:
+        yield batch, invalid
@@ -1,41 +1,94 @@
 import functools
 import logging
+import random
 import time
 import inspect
 
+from src.core.config import config
+from src.utils.metrics import function_duration
+
 logger = logging.getLogger(__name__)
 
 
-def log_debug(func):
+def log_debug(func=None, *, sample_rate: float | None = None, mode: str | None = None):
+    """Декоратор отладочного логирования вызовов
+
+    Синхронная или асинхронная обёртка выбирается один раз при декорировании.
+    Аргументы форматируются, только если логгер включён для DEBUG, поэтому
+    при уровне INFO и выше обёртка почти ничего не стоит: уровень
+    проверяется раньше выборки, и random не вызывается. Ошибки
+    логируются всегда.
+    Args:
+        sample_rate (float): доля вызовов, которые логируются или замеряются,
+            по умолчанию config.log_debug_sample_rate
+        mode (str): "log" - строки в лог, "histogram" - только замер времени
+            в гистограмму function_duration, "off" - без обёртки,
+            по умолчанию config.log_debug_mode
+    Использование: @log_debug или @log_debug(sample_rate=0.01)
+    """
+    if func is None:
+        return functools.partial(log_debug, sample_rate=sample_rate, mode=mode)
+
     func_name = func.__name__
+    rate = config.log_debug_sample_rate if sample_rate is None else sample_rate
+    mode = mode or config.log_debug_mode
+    if mode == "off":
+        return func
+    histogram = mode == "histogram"
 
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        if inspect.iscoroutinefunction(func):
+    def sampled() -> bool:
+        return rate >= 1 or random.random() < rate
 
-            async def async_wrapper():
-                start_time = time.perf_counter()
-                logger.debug(f"Вызов (async) {func_name}, аргументы {args} {kwargs}")
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            trace = (histogram or logger.isEnabledFor(logging.DEBUG)) and sampled()
+            if not trace:
                 try:
-                    result = await func(*args, **kwargs)
-                    exec_time = time.perf_counter() - start_time
-                    logger.debug(f"Завершено {func_name} за {exec_time:.4f}с")
-                    return result
+                    return await func(*args, **kwargs)
                 except Exception as e:
                     logger.error(f"Ошибка в {func_name}: {e}", exc_info=True)
                     raise
-
-            return async_wrapper()
-        else:
             start_time = time.perf_counter()
-            logger.debug(f"Вызов (sync) {func_name}")
+            if not histogram:
+                logger.debug(f"Вызов (async) {func_name}, аргументы {args} {kwargs}")
             try:
-                result = func(*args, **kwargs)
-                exec_time = time.perf_counter() - start_time
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"Ошибка в {func_name}: {e}", exc_info=True)
+                raise
+            exec_time = time.perf_counter() - start_time
+            if histogram:
+                function_duration.observe(exec_time, func_name)
+            else:
                 logger.debug(f"Завершено {func_name} за {exec_time:.4f}с")
-                return result
+            return result
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        trace = (histogram or logger.isEnabledFor(logging.DEBUG)) and sampled()
+        if not trace:
+            try:
+                return func(*args, **kwargs)
             except Exception as e:
                 logger.error(f"Ошибка в {func_name}: {e}", exc_info=True)
                 raise
+        start_time = time.perf_counter()
+        if not histogram:
+            logger.debug(f"Вызов (sync) {func_name}")
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Ошибка в {func_name}: {e}", exc_info=True)
+            raise
+        exec_time = time.perf_counter() - start_time
+        if histogram:
+            function_duration.observe(exec_time, func_name)
+        else:
+            logger.debug(f"Завершено {func_name} за {exec_time:.4f}с")
+        return result
 
     return wrapper
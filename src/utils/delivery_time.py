@@ -0,0 +1,55 @@
+from datetime import UTC, datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from src.core.config import config
+
+
+def parse_delivery_time(value: str) -> time:
+    """Разобрать время доставки в формате ЧЧ:ММ
+    Args:
+        value (str): время, например 09:30
+    Returns:
+        time: время без секунд
+    Raises:
+        ValueError: неверный формат
+    """
+    try:
+        hours, minutes = value.split(":")
+        return time(int(hours), int(minutes))
+    except ValueError:
+        raise ValueError(f"Неверное время {value!r}, нужно ЧЧ:ММ")
+
+
+def parse_timezone(value: str) -> ZoneInfo:
+    """Найти часовой пояс по имени IANA, например Europe/Moscow
+    Raises:
+        ValueError: неизвестный часовой пояс
+    """
+    try:
+        return ZoneInfo(value)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Неизвестный часовой пояс {value!r}")
+
+
+def next_delivery_at(
+    delivery_time: str | None,
+    timezone: str | None,
+    now: datetime | None = None,
+) -> datetime:
+    """Ближайший момент доставки после now
+    Args:
+        delivery_time (str | None): ЧЧ:ММ, по умолчанию config.default_delivery_time
+        timezone (str | None): часовой пояс, по умолчанию config.default_timezone
+        now (datetime | None): текущее время в UTC без tzinfo
+    Returns:
+        datetime: момент доставки в UTC без tzinfo, как в базе
+    """
+    local_time = parse_delivery_time(delivery_time or config.default_delivery_time)
+    zone = parse_timezone(timezone or config.default_timezone)
+    now = (now or datetime.now(UTC).replace(tzinfo=None)).replace(tzinfo=UTC)
+    local_now = now.astimezone(zone)
+    candidate = datetime.combine(local_now.date(), local_time, tzinfo=zone)
+    if candidate <= local_now:
+        candidate = datetime.combine(
+            local_now.date() + timedelta(days=1), local_time, tzinfo=zone
+        )
+    return candidate.astimezone(UTC).replace(tzinfo=None)
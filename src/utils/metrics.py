@@ -0,0 +1,233 @@
+import bisect
+import threading
+
+from typing import Callable
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Registry:
+    """Набор метрик, отдаваемых эндпоинтом /metrics"""
+
+    def __init__(self):
+        self._metrics: list["Metric"] = []
+
+    def register(self, metric: "Metric") -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Базовая метрика с набором меток"""
+
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: tuple[str, ...] = (),
+        registry: Registry | None = registry,
+    ):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_labels(self.labelnames, labelvalues)} {_number(value)}"
+            for labelvalues, value in items
+        ]
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик"""
+
+    type = "counter"
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+
+class Gauge(Metric):
+    """Текущее значение, заданное явно или вычисляемое при выгрузке"""
+
+    type = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._functions: dict[tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def set_function(self, function: Callable[[], float], *labelvalues: str) -> None:
+        """Вычислять значение для набора меток в момент выгрузки"""
+        self._functions[labelvalues] = function
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for labelvalues, function in self._functions.items():
+            labels = _labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}{labels} {_number(function())}")
+        return lines
+
+
+class Histogram(Metric):
+    """Гистограмма длительностей с фиксированными границами корзин.
+
+    Значения хранятся по наборам меток: для каждого набора считается
+    число наблюдений в корзинах, их сумма и количество.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        registry: Registry | None = registry,
+    ):
+        super().__init__(name, description, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        self._values: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        """Добавить наблюдение"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                # [счётчики корзин + корзина +Inf, сумма, количество]
+                entry = self._values[labelvalues] = [
+                    [0] * (len(self.buckets) + 1),
+                    0.0,
+                    0,
+                ]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def snapshot(self) -> dict[tuple[str, ...], dict]:
+        """Накопленные значения: корзины (нарастающим итогом), сумма, количество"""
+        with self._lock:
+            result = {}
+            for labelvalues, (counts, total, count) in self._values.items():
+                cumulative = []
+                running = 0
+                for bucket_count in counts:
+                    running += bucket_count
+                    cumulative.append(running)
+                result[labelvalues] = {
+                    "buckets": dict(zip(self.buckets + (float("inf"),), cumulative)),
+                    "sum": total,
+                    "count": count,
+                }
+            return result
+
+    def render(self) -> list[str]:
+        lines = []
+        for labelvalues, data in self.snapshot().items():
+            for bound, count in data["buckets"].items():
+                labels = _labels(self.labelnames, labelvalues, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_number(data['sum'])}")
+            lines.append(f"{self.name}_count{labels} {data['count']}")
+        return lines
+
+
+function_duration = Histogram(
+    "function_duration_seconds",
+    "Время выполнения функций, обёрнутых log_debug",
+    ("function",),
+)
+
+kudago_requests = Counter(
+    "kudago_requests_total", "Запросы к KudaGo", ("endpoint", "status")
+)
+kudago_latency = Histogram(
+    "kudago_request_seconds", "Время запросов к KudaGo", ("endpoint",)
+)
+telegram_requests = Counter(
+    "telegram_requests_total", "Запросы к Bot API", ("method", "status")
+)
+telegram_latency = Histogram(
+    "telegram_request_seconds", "Время запросов к Bot API", ("method",)
+)
+webhook_requests = Counter(
+    "webhook_updates_total",
+    "Обновления, пришедшие на вебхук, по результату приёма",
+    ("result",),
+)
+webhook_latency = Histogram("webhook_request_seconds", "Время ответа вебхука Telegram")
+webhook_processing = Histogram(
+    "webhook_update_seconds",
+    "Время от приёма обновления до конца его обработки",
+    buckets=DEFAULT_BUCKETS + (30.0, 60.0),
+)
+webhook_queue_depth = Gauge("webhook_queue_depth", "Обновления, ожидающие обработки")
+scheduler_run_duration = Histogram(
+    "scheduler_run_seconds",
+    "Длительность фоновой рассылки",
+    buckets=(1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0),
+)
+messages_sent = Counter(
+    "delivery_messages_total", "Сообщения рассылки по результату", ("result",)
+)
+messages_per_second = Gauge(
+    "delivery_messages_per_second", "Скорость последней рассылки"
+)
+delivery_failures = Counter(
+    "delivery_failures_total", "Неотправленные сообщения по классу ошибки", ("kind",)
+)
+delivery_retries = Counter(
+    "delivery_retries_total", "Повторы запросов к Bot API по причине", ("reason",)
+)
+pruned_chats = Counter(
+    "delivery_pruned_chats_total",
+    "Чаты, отключённые после ошибок доставки",
+    ("reason",),
+)
+cache_stats = Gauge("cache_stats", "Счётчики внутрипроцессных кешей", ("cache", "stat"))
@@ -0,0 +1,63 @@
+import argparse
+import asyncio
+import signal
+
+from src.core.config import config
+from src.core.logger_setup import setup_app_logging
+from src.dependencies.http_client import http_client
+from src.services.scheduler import add_delivery_jobs, leader, scheduler
+
+
+async def run_worker() -> None:
+    """Процесс рассылки без веб-сервера
+    Выполняет доставки из outbox вместе с другими воркерами
+    и приложением. Ежедневный дайджест ставит в outbox только
+    ведущий экземпляр (блокировка в базе).
+    """
+    listener = setup_app_logging()
+    listener.start()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await http_client.start()
+    add_delivery_jobs(scheduler)
+    scheduler.start()
+    shard = "все" if config.worker_shard is None else config.worker_shard
+    print(
+        f"Воркер {config.instance_id} запущен. "
+        f"Шард: {shard} из {config.worker_shards}\n"
+    )
+    try:
+        await stop.wait()
+    finally:
+        scheduler.shutdown()
+        await leader.release()
+        await http_client.close()
+        print("Воркер остановлен\n")
+        listener.stop()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Воркер рассылки")
+    parser.add_argument(
+        "--shard",
+        type=int,
+        help="номер шарда, неотрицательный остаток chat_id по модулю shards",
+    )
+    parser.add_argument("--shards", type=int, help="число шардов")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.shards is not None:
+        config.worker_shards = args.shards
+    if args.shard is not None:
+        config.worker_shard = args.shard
+    if config.worker_shard is not None and not (
+        0 <= config.worker_shard < config.worker_shards
+    ):
+        raise SystemExit("--shard должен быть в диапазоне [0, shards)")
+    asyncio.run(run_worker())